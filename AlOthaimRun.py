@@ -1,5 +1,8 @@
 # ! <D:\Heba\Practical\AlOthaimApp\AlOthaimRun.py>
+import multiprocessing
 import streamlit.web.cli as stcli
 
 if __name__ == '__main__':
+    # Spawned upload parser workers re-run this executable in the packaged build; let them run as workers
+    multiprocessing.freeze_support()
     stcli._main_run_clExplicit('src/streamlit_app.py', args=['run'], is_hello=False)
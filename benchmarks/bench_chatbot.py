@@ -0,0 +1,118 @@
+#! <D:\Heba\Practical\AlOthaimApp\benchmarks\bench_chatbot.py>
+"""
+Chatbot latency benchmark, runnable offline with the fake_llm model.
+
+Measures the time to the first visible token and to the full answer for a blocking `get_response`
+and for `stream_response`, and the latency of a repeated question served from the answer cache
+(asked with different casing and punctuation, as operators do). It also times building the fleet
+digest from synthetic check results and an incremental update where only one check changed.
+
+Run from the repository root:
+    python benchmarks/bench_chatbot.py --first-token 0.8 --token-delay 0.03 --tokens 120
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(os.path.dirname(ROOT), "src"))
+os.chdir(os.path.dirname(ROOT))
+
+from fake_llm import FakeLLM
+from context import get_context
+from chatbot import OthaimyChatbot
+from fleet_digest import estimate_tokens
+import synthetic
+
+
+def timed_stream(chunks):
+    """Consumes a chunk iterator, returning (seconds to first chunk, seconds to last chunk)."""
+    start = time.perf_counter()
+    first = None
+    for _ in chunks:
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def synthetic_results(branches, late=5):
+    """Backup and log size check results shaped like the checkers' output, `late` branches unhealthy each."""
+    now = pd.Timestamp.now()
+    servers = [f"BR{branch_id}-SRV" for branch_id in synthetic.branch_ids(branches)]
+    backup = pd.DataFrame({"Server ID": servers, "Last Backup Date": [now] * len(servers)})
+    stale = backup.head(late).assign(**{
+        "Last Backup Date": now - pd.Timedelta(hours=30), "Severity": "Critical", "Ping Status": "Host Down",
+    })
+    logsize = pd.DataFrame({"Server ID": servers, "Size (GB)": [5.0] * len(servers), "File Path": "D:\\log.ldf"})
+    large = logsize.head(late).assign(**{"Size (GB)": 45.5, "Severity": "Critical"})
+    return (backup.iloc[late:], stale), (logsize.iloc[late:], large)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--first-token", type=float, default=0.5, help="Seconds before the fake model's first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Seconds between tokens")
+    parser.add_argument("--tokens", type=int, default=80, help="Tokens per answer")
+    parser.add_argument("--branches", type=int, default=500, help="Branches in the synthetic check results")
+    args = parser.parse_args()
+
+    llm = FakeLLM(first_token_delay=args.first_token, token_delay=args.token_delay, tokens=args.tokens)
+    chatbot = OthaimyChatbot(get_context(), llm=llm)
+    chatbot.answer_cache.clear()
+
+    backup, logsize = synthetic_results(args.branches)
+    start = time.perf_counter()
+    chatbot.fleet_digest.update("backup", backup)
+    chatbot.fleet_digest.update("logsize", logsize)
+    version, digest = chatbot.fleet_digest.render()
+    digest_build = time.perf_counter() - start
+
+    # Blocking: nothing is shown until the whole answer is back
+    start = time.perf_counter()
+    chatbot.get_response("Which branches missed backup?")
+    blocking = time.perf_counter() - start
+
+    streaming = timed_stream(chatbot.stream_response("Which branches have a large log file?"))
+    cached = timed_stream(chatbot.stream_response("which branches missed  BACKUP"))
+
+    # Same backup data again: nothing is rebuilt and cached answers stay valid
+    start = time.perf_counter()
+    unchanged = chatbot.fleet_digest.update("backup", backup)
+    digest_unchanged = time.perf_counter() - start
+    # One more large log file: only the log size section is rebuilt and the answers are regenerated
+    start = time.perf_counter()
+    chatbot.fleet_digest.update("logsize", synthetic_results(args.branches, late=6)[1])
+    chatbot.fleet_digest.render()
+    digest_incremental = time.perf_counter() - start
+    new_data = timed_stream(chatbot.stream_response("Which branches missed backup?"))
+
+    ms = lambda seconds: round(seconds * 1000, 3)
+    results = {
+        "parameters": vars(args),
+        "blocking": {"first_token_ms": ms(blocking), "total_ms": ms(blocking)},
+        "streaming": {"first_token_ms": ms(streaming[0]), "total_ms": ms(streaming[1])},
+        "cached_repeat": {"first_token_ms": ms(cached[0]), "total_ms": ms(cached[1])},
+        "new_data_repeat": {"first_token_ms": ms(new_data[0]), "total_ms": ms(new_data[1])},
+        "digest": {
+            "build_ms": ms(digest_build),
+            "unchanged_update_ms": ms(digest_unchanged),
+            "unchanged_rebuilt": unchanged,
+            "incremental_update_ms": ms(digest_incremental),
+            "token_budget": chatbot.fleet_digest.token_budget,
+            "estimated_tokens": estimate_tokens(digest),
+            "version": version,
+        },
+        "model_calls": llm.calls,
+        "answer_cache": chatbot.answer_cache.statistics(),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#! <D:\Heba\Practical\AlOthaimApp\benchmarks\bench_importtime.py>
+"""
+Import-time profile of the Home page startup path.
+
+Runs `python -X importtime` on the modules the Home page needs (streamlit_app and what it pulls in),
+reports the slowest imports, checks that the heavy modules (pandas, numpy, pyodbc, openpyxl,
+langchain_google_genai) stay unloaded until their pages are opened, and compares the time to import
+the app and build its object against a target. Nothing is rendered: `main()` is not run, so the
+figure is the import cost of the startup path, not the full time to first render.
+
+Run from the repository root:
+    python benchmarks/bench_importtime.py --target-ms 1500 --top 15
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("pandas", "numpy", "pyodbc", "openpyxl", "langchain_google_genai")
+
+# Imports the Home page path and builds the app object, like the first lines of a Streamlit run
+# Heavy modules already loaded by streamlit itself are reported separately, the app can not avoid them
+HOME_SCRIPT = """
+import sys, json, time
+heavy = %r
+start = time.perf_counter()
+import streamlit, streamlit_option_menu
+framework_ms = (time.perf_counter() - start) * 1000
+by_framework = [m for m in heavy if m in sys.modules]
+import streamlit_app
+app = streamlit_app.AlOthaimApp()
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({
+    "elapsed_ms": elapsed,
+    "framework_ms": framework_ms,
+    "by_framework": by_framework,
+    "loaded": [m for m in heavy if m in sys.modules and m not in by_framework],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def parse_importtime(stderr):
+    """Parses `-X importtime` lines into (module, self_us, cumulative_us) tuples."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-ms", type=float, default=1500, help="Import-time target for the Home page startup path")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to report")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=os.path.join(ROOT, "src"))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", HOME_SCRIPT],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(proc.stderr)
+
+    home = json.loads(proc.stdout.strip().splitlines()[-1])
+    rows = parse_importtime(proc.stderr)
+    # Top-level packages only, nested imports are already in their parent's cumulative time.
+    # -X importtime indents every name by one space, plus two per nesting level
+    top_level = [row for row in rows if len(row[0]) - len(row[0].lstrip()) == 1]
+    slowest = sorted(top_level, key=lambda row: row[2], reverse=True)[:args.top]
+
+    results = {
+        "home_import_ms": round(home["elapsed_ms"], 1),
+        "streamlit_import_ms": round(home["framework_ms"], 1),
+        "target_ms": args.target_ms,
+        "within_target": home["elapsed_ms"] <= args.target_ms,
+        "heavy_modules_loaded_by_streamlit": home["by_framework"],
+        "heavy_modules_loaded": home["loaded"],
+        "slowest_imports": [
+            {"module": name.strip(), "cumulative_ms": round(cumulative / 1000, 1), "self_ms": round(self_us / 1000, 1)}
+            for name, self_us, cumulative in slowest
+        ],
+    }
+    print(json.dumps(results, indent=2))
+    if not results["within_target"] or results["heavy_modules_loaded"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#! <D:\Heba\Practical\AlOthaimApp\benchmarks\bench_startup.py>
+"""
+Startup / rerun benchmark for the shared application context.
+
+Compares what each of the five `Base` constructions used to pay on every Streamlit rerun (read
+.env, config.toml and branch_data.json, and add one more log file handler) with the cost of
+constructing the checkers on top of the already-built shared context (what a rerun pays now).
+The staging server is replaced by the in-memory fake_pyodbc backend, so no ODBC driver is needed.
+
+Run from the repository root:
+    python benchmarks/bench_startup.py --reruns 50
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+from datetime import datetime
+
+import pytz
+import toml
+from dotenv import load_dotenv
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+sys.path.insert(0, BENCHMARKS)
+sys.path.insert(0, os.path.join(ROOT, "src"))
+os.chdir(ROOT)
+
+import fake_pyodbc
+
+# Must happen before the application modules import pyodbc
+fake_pyodbc.install()
+
+from context import get_context
+from base import Base
+from data_processing import DataProcessor
+from check_backup import BackupChecker
+from check_logsize import CheckLogSize
+from open_branch import OpenNewBranch
+
+CHECKERS = (Base, DataProcessor, BackupChecker, CheckLogSize, OpenNewBranch)
+
+
+def legacy_setup(logger, log_path):
+    """
+    What `Base.__init__` did before the shared context: load .env, read config.toml and
+    branch_data.json, build the connection string and add a new file handler to the logger.
+    """
+    load_dotenv(os.path.join("..", ".env"))
+    try:
+        config = toml.load('.streamlit/config.toml')
+    except (OSError, toml.TomlDecodeError):
+        config = {}
+    settings = {
+        'server_ip': os.getenv('DB_SERVER_IP', "10.20.0.10"),
+        'db_name': os.getenv('DB_NAME', "AlOthaimApp"),
+        'uid': os.getenv('DB_USERNAME', "sa"),
+        'pwd': os.getenv('DB_PASSWORD', "sa"),
+    }
+    stag_connection = (
+        f"DRIVER={{ODBC Driver 17 for SQL Server}};"
+        f"SERVER={settings['server_ip']};"
+        f"UID={settings['uid']};"
+        f"PWD={settings['pwd']};"
+        f"DATABASE={settings['db_name']};"
+    )
+
+    pytz.timezone('Africa/Cairo')
+    logger.setLevel(config.get('logger', {}).get('level', 'INFO'))
+    formatter = logging.Formatter(config.get('logger', {}).get('format', "%(asctime)s - [%(levelname)s] - %(message)s"))
+    # Handlers were never removed, so every construction stacked one more on the same logger
+    file_handler = logging.FileHandler(os.path.join(log_path, f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.log"))
+    file_handler.setFormatter(formatter)
+    logger.addHandler(file_handler)
+
+    with open(os.path.abspath(os.path.join("assets", "branch_data.json")), "r", encoding="utf-8") as f:
+        branch_data = json.load(f)
+    return stag_connection, branch_data
+
+
+def time_ms(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reruns", type=int, default=50, help="Number of simulated Streamlit reruns")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    context = get_context()
+    first_start_ms = (time.perf_counter() - start) * 1000
+
+    # Before: every rerun repeated the whole setup once per Base construction, on one shared logger
+    legacy_logger = logging.getLogger("bench_startup.legacy")
+    legacy_logger.propagate = False
+
+    # After: every rerun only wires the checkers to the shared context
+    def new_rerun():
+        for checker in CHECKERS:
+            checker(context)
+
+    with tempfile.TemporaryDirectory() as log_path:
+        def old_rerun():
+            for _ in CHECKERS:
+                legacy_setup(legacy_logger, log_path)
+            # Every page logs at least once per rerun, through all the handlers stacked so far
+            legacy_logger.info("rerun")
+
+        rerun_before_ms = time_ms(old_rerun, args.reruns)
+        stacked_handlers = len(legacy_logger.handlers)
+        for handler in list(legacy_logger.handlers):
+            legacy_logger.removeHandler(handler)
+            handler.close()
+
+    def new_rerun_logged():
+        new_rerun()
+        context.logger.info("rerun")
+
+    results = {
+        "first_start_ms": round(first_start_ms, 3),
+        "rerun_before_ms": round(rerun_before_ms, 3),
+        "rerun_after_ms": round(time_ms(new_rerun_logged, args.reruns), 3),
+        "stacked_handlers_before": stacked_handlers,
+        "reruns": args.reruns,
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+#! <D:\Heba\Practical\AlOthaimApp\benchmarks\fake_llm.py>
+"""
+Local stand-in for the Gemini chat model, used only by the benchmarks.
+
+It implements the two langchain methods OthaimyChatbot uses, `invoke` and `stream`, with an
+injectable time-to-first-token and per-token delay, so the chatbot can be measured offline.
+Pass it as `OthaimyChatbot(context, llm=FakeLLM(...))`.
+"""
+
+import time
+
+
+class Chunk:
+    """Message or message chunk, exposing `.content` like langchain's AIMessage."""
+
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+
+    def __init__(self, first_token_delay=0.5, token_delay=0.02, tokens=80):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.calls = 0
+
+    def _tokens(self, prompt):
+        words = str(prompt).split() or ["answer"]
+        return [f"{words[i % len(words)]} " for i in range(self.tokens)]
+
+    def stream(self, prompt):
+        self.calls += 1
+        time.sleep(self.first_token_delay)
+        for i, token in enumerate(self._tokens(prompt)):
+            if i:
+                time.sleep(self.token_delay)
+            yield Chunk(token)
+
+    def invoke(self, prompt):
+        return Chunk("".join(chunk.content for chunk in self.stream(prompt)))
@@ -0,0 +1,212 @@
+#! <D:\Heba\Practical\AlOthaimApp\benchmarks\fake_pyodbc.py>
+"""
+In-memory stand-in for the `pyodbc` module, used only by the benchmarks.
+
+It serves Backup_DB, logfile_size and OpenBranchSteps from synthetic rows, with injectable
+per-call latency and connection failure rate, and simulates branch servers that never answer.
+Install it with `install()` before any application module is imported.
+"""
+
+import re
+import sys
+import time
+import random
+import datetime
+
+import synthetic
+
+
+class Error(Exception):
+    pass
+
+
+class OperationalError(Error):
+    pass
+
+
+class InterfaceError(Error):
+    pass
+
+
+class ProgrammingError(Error):
+    pass
+
+
+class FakeServer:
+    """Behaviour of the fake backend, shared by every connection."""
+
+    def __init__(self, branches=56, latency=0.0, failure_rate=0.0, unreachable=(), login_delay=0.0, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.login_delay = login_delay
+        # Third octet of the branch servers that never answer, e.g. {12} for 10.20.12.10
+        self.unreachable = set(unreachable)
+        self.rng = random.Random(seed)
+        self.backup = synthetic.backup_rows(branches, seed=seed)
+        self.logfile = synthetic.logfile_rows(branches, seed=seed)
+        self.steps = synthetic.opening_steps(seed=seed)
+        self.updates = 0
+
+
+server = FakeServer()
+
+
+def configure(**kwargs):
+    """Replaces the fake backend, see FakeServer for the options."""
+    global server
+    server = FakeServer(**kwargs)
+    return server
+
+
+def install():
+    """Registers this module as `pyodbc` so application imports pick it up."""
+    sys.modules["pyodbc"] = sys.modules[__name__]
+
+
+def fake_tcp_preflight(hosts, port=1433, timeout=1.0, concurrency=256):
+    """Replacement for reachability.tcp_preflight: unreachable branches time out, the rest answer."""
+    import reachability
+
+    statuses = {}
+    for host in dict.fromkeys(hosts):
+        octets = host.split(".")
+        down = len(octets) == 4 and int(octets[2]) in server.unreachable
+        statuses[host] = reachability.HOST_DOWN if down else reachability.REACHABLE
+    if any(status == reachability.HOST_DOWN for status in statuses.values()):
+        # The real sweep waits one timeout for the hosts that never answer
+        time.sleep(timeout)
+    return statuses
+
+
+def _host(connection_string):
+    match = re.search(r"SERVER=([^;]+)", connection_string)
+    return match.group(1) if match else ""
+
+
+def connect(connection_string, timeout=0, **kwargs):
+    host = _host(connection_string)
+    octets = host.split(".")
+    if len(octets) == 4 and octets[1] == "20" and octets[2] != "0" and int(octets[2]) in server.unreachable:
+        # A dead branch: the ODBC login runs into its timeout
+        time.sleep(timeout if timeout else 15)
+        raise OperationalError(f"HYT00 Login timeout expired ({host})")
+    time.sleep(server.login_delay)
+    if server.rng.random() < server.failure_rate:
+        raise OperationalError(f"08001 TCP Provider: connection to {host} failed")
+    return Connection(host)
+
+
+class Connection:
+
+    def __init__(self, host):
+        self.host = host
+        self.timeout = 0  # query timeout in seconds, like pyodbc.Connection.timeout
+
+    def cursor(self):
+        return Cursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _description(rows, names):
+    """Builds cursor.description from the Python types of the first row."""
+    types = [type(v) for v in rows[0]] if rows else [str] * len(names)
+    return [(name, type_code, None, None, None, None, True) for name, type_code in zip(names, types)]
+
+
+class Cursor:
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.fast_executemany = False
+        self.description = None
+        self.rowcount = -1
+        self._rows = []
+
+    def _result(self, rows, names):
+        self._rows = list(rows)
+        self.description = _description(self._rows, names)
+
+    def execute(self, sql, *params):
+        time.sleep(server.latency)
+        query = " ".join(sql.split()).lower()
+        if "@@servername" in query:
+            self._result([(self.connection.host,)], ["name"])
+        elif query == "select 1":
+            self._result([(1,)], ["one"])
+        elif "backup_db" in query:
+            self._result(sorted(server.backup), ["server", "last_db_backup_date"])
+        elif "logfile_size" in query:
+            self._result(self._logfile(query, params), ["Server", "SizeGB", "physical_name", "Severity"])
+        elif query.startswith("select") and "openbranchsteps" in query:
+            self._result(server.steps, ["Category", "StepID", "Description", "Completed"])
+        elif query.startswith("update") and "openbranchsteps" in query:
+            server.updates += 1
+            self._result([], [])
+            self.description = None
+        else:
+            raise ProgrammingError(f"Fake pyodbc can not run: {sql}")
+        return self
+
+    def _logfile(self, query, params):
+        # Parameters: TOP (?), the severity thresholds highest first, then the keyset (Server, physical_name)
+        params = list(params)
+        top = params.pop(0)
+        after = None
+        if "where server >" in query:
+            after_name, _, after_path = params[-3:]
+            params = params[:-3]
+            after = (after_name, after_path)
+        rows = []
+        for name, size_mb, path in server.logfile:
+            if after is not None and (name, path) <= after:
+                continue
+            size_gb = round(size_mb / 1024.0, 2)
+            severity = next((len(params) - i for i, limit in enumerate(params) if size_gb > limit), 0)
+            rows.append((name, size_gb, path, severity))
+        if "sizegb desc" in query:
+            rows.sort(key=lambda row: (-row[1], row[0]))
+        else:
+            rows.sort(key=lambda row: (row[0], row[2]))
+        return rows[:top]
+
+    def executemany(self, sql, seq_of_params):
+        # fast_executemany sends the whole batch in one round trip
+        params = list(seq_of_params)
+        batches = 1 if self.fast_executemany else len(params)
+        time.sleep(server.latency * batches)
+        server.updates += len(params)
+        self.rowcount = len(params)
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def close(self):
+        pass
+
+
+# Types the application may reference through pyodbc
+Row = tuple
+Date = datetime.date
+Timestamp = datetime.datetime
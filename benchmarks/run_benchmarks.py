@@ -0,0 +1,257 @@
+#! <D:\Heba\Practical\AlOthaimApp\benchmarks\run_benchmarks.py>
+"""
+End-to-end benchmark suite for AlOthaimApp, runnable without a SQL Server or VPN.
+
+A synthetic Upload Sessions workbook is generated and the staging / branch servers are replaced
+by the in-memory fake_pyodbc backend. Each stage is timed over several repeats and the results
+are written as JSON, tagged with the current git commit, so runs can be compared across commits.
+
+Every result of every stage is checked against the synthetic dataset (row counts, statuses), so a
+stage that silently fails fast is never reported as a speedup; the run exits with status 1 when any
+result is wrong. The checks are skipped with --failure-rate, where failed connections are expected.
+
+Run from the repository root:
+    python benchmarks/run_benchmarks.py --rows 200000 --latency 0.02 --unreachable 5 --output bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(os.path.dirname(ROOT), "src"))
+os.chdir(os.path.dirname(ROOT))
+
+import fake_pyodbc
+import synthetic
+
+# Must happen before the application modules import pyodbc
+fake_pyodbc.install()
+
+import pandas as pd
+
+import reachability
+from context import get_context
+from data_processing import DataProcessor
+from check_backup import BackupChecker
+from check_logsize import CheckLogSize
+from open_branch import OpenNewBranch
+from fleet_overview import FleetOverview
+
+
+def measure(func, repeat, check=None):
+    """
+    Runs func `repeat` times and returns timing statistics in milliseconds.
+    `check(result)` returns what is wrong with one result, or None when it is right; the problems
+    found are listed under "errors".
+    """
+    samples, errors = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = func()
+        samples.append((time.perf_counter() - start) * 1000)
+        problem = check(value) if check is not None else None
+        if problem and problem not in errors:
+            errors.append(problem)
+    stats = {
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "max_ms": round(max(samples), 3),
+        "repeat": repeat,
+    }
+    if errors:
+        stats["errors"] = errors
+    return stats
+
+
+def frame_count(frames, expected, name):
+    """Checks a (ok, problem) pair of DataFrames holds `expected` rows in total."""
+    if frames is None or any(not isinstance(df, pd.DataFrame) for df in frames):
+        return f"{name} returned no DataFrames"
+    if frames[0].attrs.get("unreachable_staging"):
+        return f"{name} could not reach {frames[0].attrs['unreachable_staging']}"
+    rows = sum(len(df) for df in frames)
+    if rows != expected:
+        return f"{name} returned {rows} rows, expected {expected}"
+    return None
+
+
+class ResultChecks:
+    """Expected results of every stage, derived from the synthetic dataset served by fake_pyodbc."""
+
+    def __init__(self, args, context):
+        self.args = args
+        self.registry = context.branch_registry
+        self.backup_checker = BackupChecker(context)
+        self.server = fake_pyodbc.server
+        self.applied = synthetic.applied_branch_ids(args.rows, args.branches, args.seed)
+
+    def process_data(self, processed):
+        if not isinstance(processed, pd.DataFrame):
+            return f"process_data returned {processed!r}"
+        found = set(processed["Branch ID"])
+        if len(processed) != len(self.applied) or found != self.applied:
+            return f"process_data returned {len(processed)} branches, expected {len(self.applied)}"
+        return None
+
+    def missing_branches(self, processed):
+        def check(frames):
+            expected = len(self.registry.keys | set(processed["Branch ID"]))
+            return frame_count(frames, expected, "check_missing_branches")
+        return check
+
+    def ping_status(self, server_id):
+        try:
+            server_ip, _ = self.backup_checker.branch_target(server_id)
+        except ValueError:
+            return reachability.UNKNOWN_HOST
+        # fake_pyodbc takes branch servers down by the third octet of their address
+        return reachability.HOST_DOWN if int(server_ip.split(".")[2]) in self.server.unreachable else reachability.SUCCESS
+
+    def backup(self, frames):
+        problem = frame_count(frames, len(self.server.backup), "check_last_backup_date")
+        if problem:
+            return problem
+        unhealthy = frames[1]
+        if unhealthy.empty:
+            return None
+        wrong = [(server_id, status) for server_id, status in zip(unhealthy["Server ID"], unhealthy["Ping Status"])
+                 if status != self.ping_status(server_id)]
+        return f"check_last_backup_date pinged {wrong}" if wrong else None
+
+    def logsize(self, frames):
+        return frame_count(frames, len(self.server.logfile), "check_logfile_size")
+
+    def fleet_sweep(self, outcome):
+        sweep, matrix = outcome
+        if sweep.errors:
+            return f"fleet_sweep failed: {sweep.errors}"
+        problem = self.backup(sweep.results.get("backup")) or self.logsize(sweep.results.get("logsize"))
+        if problem:
+            return f"fleet_sweep: {problem}"
+        if len(matrix) < len(self.registry):
+            return f"fleet_sweep matrix has {len(matrix)} rows, expected at least {len(self.registry)}"
+        return None
+
+    @staticmethod
+    def saved(expected):
+        def check(written):
+            return None if written == expected else f"save_checkbox_states wrote {written} rows, expected {expected}"
+        return check
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows in the synthetic upload workbook")
+    parser.add_argument("--branches", type=int, default=56, help="Branches in the synthetic fleet")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every fake SQL call")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability that a fake connection fails")
+    parser.add_argument("--unreachable", type=int, default=0, help="Number of branch servers that never answer")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeats per stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    ids = synthetic.branch_ids(args.branches)
+    fake_pyodbc.configure(
+        branches=args.branches,
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        unreachable={branch_id % 10000 for branch_id in ids[:args.unreachable]},
+        seed=args.seed,
+    )
+
+    # Branch servers are simulated, so is the TCP sweep in front of their logins
+    reachability.tcp_preflight = fake_pyodbc.fake_tcp_preflight
+    context = get_context()
+    data_processor = DataProcessor(context)
+    backup_checker = BackupChecker(context)
+    logsize_checker = CheckLogSize(context)
+    new_branch = OpenNewBranch(context)
+    checks = ResultChecks(args, context)
+    strict = not args.failure_rate
+
+    def checked(check):
+        return check if strict else None
+
+    stages = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        workbook = os.path.join(tmp, "upload_sessions.xlsx")
+        start = time.perf_counter()
+        synthetic.generate_workbook(workbook, rows=args.rows, branches=args.branches, seed=args.seed)
+        generate_ms = (time.perf_counter() - start) * 1000
+
+        stages["process_data"] = measure(
+            lambda: data_processor.process_data(workbook), args.repeat, checks.process_data
+        )
+        processed = data_processor.process_data(workbook)
+        if not isinstance(processed, pd.DataFrame):
+            sys.exit(f"process_data could not read the synthetic workbook: {processed}")
+
+    stages["check_missing_branches"] = measure(
+        lambda: data_processor.check_missing_branches(processed), args.repeat, checks.missing_branches(processed)
+    )
+    stages["check_last_backup_date"] = measure(
+        lambda: backup_checker.check_last_backup_date(refresh=True), args.repeat, checked(checks.backup)
+    )
+    stages["check_logfile_size"] = measure(
+        lambda: logsize_checker.check_logfile_size(refresh=True), args.repeat, checked(checks.logsize)
+    )
+    # Backup and log size checks run concurrently: the sweep should take about as long as the slower one
+    overview = FleetOverview(context)
+
+    def fleet_sweep():
+        sweep = overview.sweep(("backup", "logsize"), refresh=True)
+        return sweep, overview.health_matrix(sweep)
+
+    stages["fleet_sweep"] = measure(fleet_sweep, args.repeat, checked(checks.fleet_sweep))
+
+    steps = new_branch.load_checkbox_states()
+    if steps is None:
+        sys.exit("load_checkbox_states could not read OpenBranchSteps")
+    states = steps.groupby('Category')['Completed'].apply(list).to_dict()
+    changed = {category: list(values) for category, values in states.items()}
+    first = next(iter(changed))
+    changed[first][0] = not changed[first][0]
+    stages["save_checkbox_states_full"] = measure(
+        lambda: new_branch.save_checkbox_states(states, {}), args.repeat, checked(checks.saved(len(steps)))
+    )
+    stages["save_checkbox_states_diff"] = measure(
+        lambda: new_branch.save_checkbox_states(changed, states), args.repeat, checked(checks.saved(1))
+    )
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "parameters": vars(args),
+        "workbook_generate_ms": round(generate_ms, 3),
+        "stages": stages,
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+    failed = {name: stage["errors"] for name, stage in stages.items() if "errors" in stage}
+    if failed:
+        sys.exit(f"Stages returned wrong results: {json.dumps(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#! <D:\Heba\Practical\AlOthaimApp\benchmarks\synthetic.py>
+"""
+Synthetic fleet data for the benchmarks: Dynamics 365 Upload Sessions workbooks and the rows of
+the staging-server tables (Backup_DB, logfile_size, OpenBranchSteps).
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from openpyxl import Workbook
+
+# Columns of the real Upload Sessions export; only the first three are used by the app
+UPLOAD_COLUMNS = ["Channel database", "Date uploaded", "Status", "Session ID", "Upload type", "Rows uploaded", "Message"]
+STATUSES = ["Applied", "Applied", "Applied", "Failed", "Pending"]
+
+
+def branch_ids(branches):
+    """Returns `branches` branch IDs in the 50001.. range used by branch_data.json."""
+    return [50001 + i for i in range(branches)]
+
+
+def upload_rows(rows=100_000, branches=56, seed=0, now=None):
+    """Yields the rows of a synthetic Upload Sessions export, in UPLOAD_COLUMNS order."""
+    rng = random.Random(seed)
+    ids = branch_ids(branches)
+    now = now or datetime.now().replace(microsecond=0)
+    for i in range(rows):
+        branch_id = rng.choice(ids)
+        yield [
+            f"EG{branch_id}-CHANNELDB",
+            now - timedelta(minutes=rng.randint(0, 60 * 24 * 30)),
+            rng.choice(STATUSES),
+            f"S{i:08d}",
+            "Transactions",
+            rng.randint(1, 5000),
+            "",
+        ]
+
+
+def applied_branch_ids(rows=100_000, branches=56, seed=0):
+    """Branch IDs (as strings) with at least one "Applied" upload in the workbook of the same parameters."""
+    return {row[0][2:].split("-")[0] for row in upload_rows(rows, branches, seed) if row[2] == "Applied"}
+
+
+def generate_workbook(path, rows=100_000, branches=56, seed=0):
+    """
+    Writes a synthetic Upload Sessions workbook with write-only openpyxl.
+    Parameters:
+        path (str): Destination .xlsx path.
+        rows (int): Number of upload session rows.
+        branches (int): Number of distinct channel databases.
+        seed (int): Random seed, so runs across commits see the same file.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Upload sessions")
+    sheet.append(UPLOAD_COLUMNS)
+    for row in upload_rows(rows, branches, seed):
+        sheet.append(row)
+    workbook.save(path)
+    return path
+
+
+def backup_rows(branches=56, stale_ratio=0.2, seed=0):
+    """Rows of Backup_DB: (server, last_db_backup_date), with `stale_ratio` of branches missing their backup."""
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+    rows = []
+    for branch_id in branch_ids(branches):
+        hours = rng.uniform(2, 72) if rng.random() < stale_ratio else rng.uniform(0, 0.9)
+        rows.append((f"BR{branch_id}-SRV", now - timedelta(hours=hours)))
+    return rows
+
+
+def logfile_rows(branches=56, large_ratio=0.1, seed=0):
+    """Rows of logfile_size: (Server, SizeMB, physical_name), with `large_ratio` of branches over 20 GB."""
+    rng = random.Random(seed)
+    rows = []
+    for branch_id in branch_ids(branches):
+        size_mb = rng.randint(21, 60) * 1024 if rng.random() < large_ratio else rng.randint(100, 19 * 1024)
+        rows.append((f"BR{branch_id}-SRV", size_mb, f"D:\\SQLData\\CHANNEL_{branch_id}_log.ldf"))
+    return rows
+
+
+def opening_steps(categories=8, steps_per_category=12, seed=0):
+    """Rows of OpenBranchSteps: (Category, StepID, Description, Completed)."""
+    rng = random.Random(seed)
+    return [
+        (f"{c + 1}. Category {c + 1}", step_id, f"Step {step_id} of category {c + 1}", rng.random() < 0.5)
+        for c in range(categories)
+        for step_id in range(1, steps_per_category + 1)
+    ]
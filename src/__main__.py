@@ -0,0 +1,13 @@
+#! <D:\Heba\Practical\AlOthaimApp\src\__main__.py>
+"""Entry point of `python -m src`, the headless batch mode (see batch.py)."""
+
+import os
+import sys
+
+# The application modules import each other by their flat names, like under `streamlit run`
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from batch import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+#! <D:\Heba\Practical\AlOthaimApp\src\answer_cache.py>
+
+import re
+import time
+import threading
+from collections import OrderedDict
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(text):
+    """
+    Reduces a chat question to the form used as cache key: case-folded, punctuation removed
+    and whitespace collapsed, so "Which branches missed backup?" and "which branches  missed backup"
+    share one answer.
+    """
+    text = _PUNCTUATION.sub(" ", text.casefold())
+    return _SPACES.sub(" ", text).strip()
+
+
+class AnswerCache:
+    """
+    Process-wide cache of chatbot answers, bounded by number of entries and by age.
+
+    Keys combine the normalized question and the fleet digest version, so an answer is reused only
+    while the data it was given is unchanged. Entries expire `ttl` seconds after they are stored; the
+    least recently used entry is dropped first when the cache is full.
+    """
+
+    def __init__(self, max_entries=256, ttl=900):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires at, answer)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0}
+
+    @staticmethod
+    def key(question, data_version=0):
+        return normalize_question(question), data_version
+
+    def get(self, key):
+        """Returns the cached answer for key, or None when it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key, answer):
+        """Stores an answer, evicting expired entries first and then the least recently used ones."""
+        with self._lock:
+            now = time.monotonic()
+            self._entries.pop(key, None)
+            self._entries[key] = (now + self.ttl, answer)
+            if len(self._entries) > self.max_entries:
+                for stale in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+                    del self._entries[stale]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def statistics(self):
+        """Returns the hit, miss and expiry counters and the number of cached answers."""
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache(max_entries=256, ttl=900):
+    """Returns the process-wide chatbot answer cache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnswerCache(max_entries=max_entries, ttl=ttl)
+        return _cache
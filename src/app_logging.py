@@ -0,0 +1,77 @@
+#! <D:\Heba\Practical\AlOthaimApp\src\app_logging.py>
+
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+
+DEFAULT_FORMAT = "%(asctime)s - [%(levelname)s] - %(filename)s:%(lineno)d - %(message)s"
+
+_listener = None
+_lock = threading.Lock()
+
+
+def _purge_old_logs(log_path, retention_days):
+    """Deletes log files in log_path that were last written more than retention_days ago."""
+    cutoff = time.time() - retention_days * 86400
+    for name in os.listdir(log_path):
+        file_path = os.path.join(log_path, name)
+        if ".log" in name and os.path.isfile(file_path) and os.path.getmtime(file_path) < cutoff:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+
+
+def _file_handler(log_path, settings):
+    """Builds the rotating file handler described by the [logger] section of config.toml."""
+    file_path = os.path.join(log_path, settings.get('file', 'alothaim.log'))
+    backup_count = settings.get('backup_count', 7)
+    if settings.get('rotation', 'size') == 'time':
+        return TimedRotatingFileHandler(
+            file_path, when=settings.get('when', 'midnight'), backupCount=backup_count, encoding="utf-8", delay=True
+        )
+    return RotatingFileHandler(
+        file_path, maxBytes=settings.get('max_mb', 10) * 1024 * 1024, backupCount=backup_count, encoding="utf-8", delay=True
+    )
+
+
+def setup_logging(config):
+    """
+    Sets up one queue-backed logging pipeline for the whole process.
+
+    Log calls only put the record on an in-memory queue; a background QueueListener thread formats
+    it and writes it to a rotating file under `logs/`. Calling this again is a no-op, so Streamlit
+    reruns never stack extra handlers.
+
+    Parameters:
+        config (dict): The parsed config.toml, the [logger] section is used.
+    Returns:
+        QueueListener: The running listener thread.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return _listener
+
+        settings = config.get('logger', {})
+        log_path = os.path.abspath("logs")
+        os.makedirs(log_path, exist_ok=True)
+        _purge_old_logs(log_path, settings.get('retention_days', 30))
+
+        file_handler = _file_handler(log_path, settings)
+        file_handler.setFormatter(logging.Formatter(settings.get('format', DEFAULT_FORMAT)))
+
+        log_queue = queue.Queue(-1)
+        root = logging.getLogger()
+        root.setLevel(settings.get('level', 'INFO'))
+        root.addHandler(QueueHandler(log_queue))
+
+        _listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+        _listener.start()
+        # Flush whatever is still queued when the process exits
+        atexit.register(_listener.stop)
+        return _listener
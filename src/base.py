@@ -1,78 +1,62 @@
 #! <D:\Heba\Practical\AlOthaimApp\src\base.py>
 
-import pytz
-import json
-import logging
-import os
-import toml
-from datetime import datetime
-from dotenv import load_dotenv
+from context import get_context
+from query_cache import get_query_cache
 
 class Base:
-    
-    def __init__(self):
-
-        # Load environment variables
-        env_path = os.path.join("..", ".env")
-        load_dotenv(env_path)
-        
-        try:
-            # Load Configuration file
-            config = toml.load('.streamlit/config.toml')
-            self.br_name = config['new_branch'].get('br_name', '') 
-            self.br_date = config['new_branch'].get('br_date', '')  
-            self.logsize_limit = config['new_branch'].get('logsize_limit', 20) 
-            
-            # load LLM model from the configuration file
-            self.model_name = config['othaimy_chatbot'].get('model_name', 'gemini-1.5-flash')
-            self.temperature= config['othaimy_chatbot'].get('temperature', 1)
-
-            # Load database connection details from environment variables
-            self.server_ip = os.getenv('DB_SERVER_IP', "10.20.0.10") 
-            self.db_name = os.getenv('DB_NAME', "AlOthaimApp") 
-            self.uid = os.getenv('DB_USERNAME', "sa")
-            self.pwd = os.getenv('DB_PASSWORD', "sa")
-
-            # Load Google API Key for Gemini from environment variables
-            self.api_key = os.getenv('GEMINI_API_KEY', '')
-        
-        except Exception as e:
-            logging.error(f"Error loading configuration file or environment variables: {e}. Using default values.")
-            self.br_name = ''
-            self.br_date = ''
-            self.logsize_limit = 50
-            self.server_ip = "10.20.0.10"
-            self.db_name = "AlOthaimApp"
-            self.uid = "sa"
-            self.pwd = "sa"
-
-        # Connecting to SQL Server
-        self.stag_connection = (
-            f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-            f"SERVER={self.server_ip};"
-            f"UID={self.uid};"
-            f"PWD={self.pwd};"
-            f"DATABASE={self.db_name};"
-        )
-
-        # Set up logger
-        self.cairo_tz = pytz.timezone('Africa/Cairo')
-        self.logger = logging.getLogger(__name__)
-        self.logger.setLevel(config['logger'].get('level', 'INFO'))
-        formatter = logging.Formatter(
-            config['logger'].get('format', "%(asctime)s - [%(levelname)s] - %(filename)s:%(lineno)d - %(message)s")
-        )
-        # Create the log file path using absolute paths
-        log_path = os.path.abspath("logs")
-        os.makedirs(log_path, exist_ok=True)
-        log_file_path = os.path.join(log_path, f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.log")
-        # Logger configuration
-        file_handler = logging.FileHandler(log_file_path)
-        file_handler.setFormatter(formatter)
-        self.logger.addHandler(file_handler)
-
-        # Load Branches data from json file 
-        self.branch_data_file = os.path.join("assets", "branch_data.json")
-        self.branch_data_file = os.path.abspath(self.branch_data_file)
-        with open(self.branch_data_file, "r", encoding="utf-8") as f:
-            self.branch_data = json.load(f)
\ No newline at end of file
+    """
+    Base class of every checker. Settings such as `stag_connection`, `branch_registry` and `logger`
+    are read from the shared `AppContext`, so constructing a checker costs nothing.
+    """
+
+    def __init__(self, context=None):
+        self.context = context if context is not None else get_context()
+
+    def __getattr__(self, name):
+        # Attributes not set on the instance fall back to the shared application context
+        context = self.__dict__.get('context')
+        if context is None:
+            raise AttributeError(name)
+        return getattr(context, name)
+
+    @property
+    def stag_pool(self):
+        """Process-wide connection pool to the staging server, shared by every checker."""
+        # Imported here so pyodbc only loads once a page talks to the staging server
+        from db_pool import get_pool
+        # Same login timeout as the staging queries, whichever of them creates the shared pool first
+        return get_pool(self.stag_connection, login_timeout=int(self.staging_endpoints[0].timeout),
+                        **self.pool_settings)
+
+    @property
+    def query_cache(self):
+        """Process-wide single-flight TTL cache of staging-server health query results."""
+        return get_query_cache(self.query_cache_ttl)
+
+    def query_staging(self, run):
+        """
+        Runs a query on every staging server concurrently and merges the answers.
+
+        Parameters:
+            run (callable): Called as run(cursor) for each staging server, returns its DataFrame.
+        Returns (pd.DataFrame | None, list[str]):
+            The merged DataFrame (with a "Staging" column naming the region when several staging servers
+            are configured), or None when none answered, and the names of the staging servers that did not.
+        """
+        import pandas as pd
+        from staging import query_endpoints
+
+        answered, failed = query_endpoints(self.staging_endpoints, run, self.pool_settings)
+        if not answered:
+            return None, failed
+        if len(self.staging_endpoints) > 1:
+            frames = [df.assign(Staging=endpoint.name) for endpoint, df in answered]
+            return pd.concat(frames, ignore_index=True), failed
+        return answered[0][1], failed
+
+    @property
+    def fleet_digest(self):
+        """Process-wide token-budgeted summary of the latest check results, used as chatbot context."""
+        # Imported here so pandas only loads once a page or the poller produces results
+        from fleet_digest import get_fleet_digest
+        return get_fleet_digest(self.digest_tokens, self.freshness.labels, self.branch_registry.display_name)
@@ -0,0 +1,147 @@
+#! <D:\Heba\Practical\AlOthaimApp\src\batch.py>
+"""
+Headless batch mode: runs the backup, log size and sales checks concurrently without Streamlit and
+writes the results and the per-branch health matrix as JSON and CSV, for nightly sweeps from cron,
+Task Scheduler or a worker.
+
+Run from the repository root:
+    python -m src --checks backup logsize sales --upload exports/upload_sessions.xlsx --output results
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+
+from context import get_context
+from instrumentation import tracer
+
+logger = logging.getLogger(__name__)
+
+CHECKS = ("backup", "logsize", "sales")
+
+# File name suffixes of the (ok, problem) DataFrames each check returns
+OUTPUT_NAMES = {
+    "backup": ("healthy", "unhealthy"),
+    "logsize": ("healthy", "large"),
+    "sales": ("uploaded", "missed"),
+}
+
+
+class LocalFile:
+    """A file on disk with the part of Streamlit's UploadedFile interface DataProcessor uses."""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+
+    def getvalue(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+def print_progress(value, text=None):
+    """Progress callback writing the backup check progress to stderr."""
+    if text:
+        print(f"[{value:3d}%] {text}", file=sys.stderr)
+
+
+def run_checks(context, checks=CHECKS, uploads=(), progress=None):
+    """
+    Runs the selected checks concurrently and joins them into the per-branch health matrix.
+    Parameters:
+        context (AppContext): Shared application context.
+        checks (Iterable[str]): Any of "backup", "logsize" and "sales".
+        uploads (Iterable[str]): Upload Sessions exports for the sales check, skipped when empty.
+        progress (callable, optional): Progress callback of the backup check.
+    Returns:
+        dict[str, tuple | None]: The (ok, problem) DataFrames of each check, None when it failed.
+            The sales check also stores its per-file report under "sales_files", and the health
+            matrix is stored under "overview".
+    """
+    from fleet_overview import FleetOverview
+
+    overview = FleetOverview(context)
+    sweep = overview.sweep(checks, [LocalFile(path) for path in uploads], progress=progress)
+    results = dict(sweep.results)
+    if sweep.sales_files is not None:
+        results["sales_files"] = sweep.sales_files
+    results["overview"] = overview.health_matrix(sweep)
+    logger.info(f"Batch checks took {sweep.wall:.2f}s: {sweep.durations}")
+    return results
+
+
+def write_results(results, output_dir, formats=("json", "csv")):
+    """
+    Writes the check results to `output_dir`: one CSV per DataFrame (fleet_overview.csv for the health
+    matrix) and a single results.json.
+    Returns (list[str]): Paths of the written files.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    document = {"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "checks": {}}
+
+    for check, frames in results.items():
+        if check not in OUTPUT_NAMES:
+            continue
+        if frames is None:
+            document["checks"][check] = {"status": "failed"}
+            continue
+        entry = {"status": "ok"}
+        for name, df in zip(OUTPUT_NAMES[check], frames):
+            entry[f"{name}_count"] = len(df)
+            entry[name] = json.loads(df.to_json(orient="records", date_format="iso"))
+            if "csv" in formats:
+                path = os.path.join(output_dir, f"{check}_{name}.csv")
+                df.to_csv(path, index=False)
+                written.append(path)
+        document["checks"][check] = entry
+
+    if "overview" in results:
+        document["overview"] = json.loads(results["overview"].to_json(orient="records", date_format="iso"))
+        if "csv" in formats:
+            path = os.path.join(output_dir, "fleet_overview.csv")
+            results["overview"].to_csv(path, index=False)
+            written.append(path)
+
+    if "sales_files" in results:
+        report = results["sales_files"]
+        document["checks"].setdefault("sales", {})["files"] = json.loads(report.to_json(orient="records"))
+        if "csv" in formats:
+            path = os.path.join(output_dir, "sales_files.csv")
+            report.to_csv(path, index=False)
+            written.append(path)
+
+    if "json" in formats:
+        path = os.path.join(output_dir, "results.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2, ensure_ascii=False)
+        written.append(path)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checks", nargs="+", choices=CHECKS, default=list(CHECKS), help="Checks to run")
+    parser.add_argument("--upload", nargs="*", default=[], help="Upload Sessions exports (.xlsx, .csv, .parquet)")
+    parser.add_argument("--output", default="results", help="Directory the results are written to")
+    parser.add_argument("--format", nargs="+", choices=("json", "csv"), default=["json", "csv"])
+    parser.add_argument("--quiet", action="store_true", help="Do not print progress")
+    args = parser.parse_args(argv)
+
+    context = get_context()
+    with tracer.run("batch"):
+        results = run_checks(context, args.checks, args.upload, progress=None if args.quiet else print_progress)
+        written = write_results(results, args.output, args.format)
+
+    for path in written:
+        print(path)
+    failed = [check for check in args.checks if check in results and results[check] is None]
+    if failed:
+        logger.error(f"Checks failed: {', '.join(failed)}")
+        print(f"Checks failed: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
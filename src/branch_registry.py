@@ -0,0 +1,128 @@
+#! <D:\Heba\Practical\AlOthaimApp\src\branch_registry.py>
+
+import re
+import json
+import hashlib
+from functools import lru_cache
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+
+# Credentials used to reach the branch SQL Servers directly
+BRANCH_UID = "itops"
+BRANCH_PWD = "itops"
+
+_DIGITS = re.compile(r"(\d+)")
+
+
+# Channel database and server names repeat on every check, so parsing them is memoized. These are pure
+# functions of the name, shared by every registry; lru_cache bounds them and is safe across threads.
+@lru_cache(maxsize=4096)
+def _channel_key(channel_database):
+    """Branch key in a channel database name, e.g. "50012" for "EG50012-CHANNELDB"."""
+    match = _DIGITS.search(channel_database)
+    return match.group(1) if match else None
+
+
+@lru_cache(maxsize=4096)
+def _server_prefix(server_name):
+    """Branch part of a server name, e.g. "BR50012" for "br50012-dokki"."""
+    return server_name.split('-', 1)[0].strip().upper()
+
+
+class Branch(NamedTuple):
+    """One branch of the fleet, with everything derived from its ID computed up front."""
+    branch_id: int           # 50012
+    key: str                 # "50012", the key used in branch_data.json and in sales uploads
+    display_name: str        # "الدقي - طهران, Dokki - Tehran"
+    arabic_name: str
+    english_name: str
+    server_prefix: str       # "BR50012", server names look like "BR50012-..."
+    server_ip: str           # "10.20.12.10"
+    connection_string: str   # ODBC connection string of the branch server
+
+
+class BranchRegistry:
+    """
+    Immutable, indexed view of `assets/branch_data.json`.
+
+    It is built once per process by the application context. Lookups by numeric ID, JSON key,
+    channel database name, server name and Arabic/English name are dictionary lookups, and the
+    branch server addresses and ODBC connection strings are precomputed. The indexes are read-only
+    mappings built here and never changed, so the registry is shared by every thread without locks.
+    """
+
+    def __init__(self, branches, version):
+        self.version = version
+        self._branches = tuple(sorted(branches, key=lambda b: b.branch_id))
+        self._by_id = MappingProxyType({b.branch_id: b for b in self._branches})
+        self._by_key = MappingProxyType({b.key: b for b in self._branches})
+        self._by_prefix = MappingProxyType({b.server_prefix: b for b in self._branches})
+        by_name = {}
+        for b in self._branches:
+            for name in (b.display_name, b.arabic_name, b.english_name):
+                if name:
+                    by_name[name.casefold()] = b
+        self._by_name = MappingProxyType(by_name)
+        self.keys = frozenset(self._by_key)
+
+    @classmethod
+    def from_json_bytes(cls, raw):
+        """Builds the registry from the raw bytes of branch_data.json; the version is their content hash."""
+        data = json.loads(raw.decode("utf-8"))
+        branches = []
+        for key, display_name in data.items():
+            branch_id = int(key)
+            arabic, sep, english = display_name.partition(",")
+            if not sep:
+                arabic, english = "", display_name
+            # Branch 50012 lives on 10.20.12.10
+            server_ip = f"10.20.{branch_id % 10000}.10"
+            branches.append(Branch(
+                branch_id=branch_id,
+                key=key,
+                display_name=display_name,
+                arabic_name=arabic.strip(),
+                english_name=english.strip(),
+                server_prefix=f"BR{branch_id}",
+                server_ip=server_ip,
+                connection_string=(
+                    f"DRIVER={{ODBC Driver 17 for SQL Server}};"
+                    f"SERVER={server_ip};"
+                    f"UID={BRANCH_UID};"
+                    f"PWD={BRANCH_PWD};"
+                ),
+            ))
+        return cls(branches, hashlib.sha256(raw).hexdigest()[:16])
+
+    def __len__(self):
+        return len(self._branches)
+
+    def __iter__(self):
+        return iter(self._branches)
+
+    def __contains__(self, key):
+        return str(key) in self._by_key
+
+    def by_id(self, branch_id) -> Optional[Branch]:
+        """Looks up a branch by numeric ID or by its string key."""
+        if isinstance(branch_id, str):
+            return self._by_key.get(branch_id)
+        return self._by_id.get(branch_id)
+
+    def by_name(self, name) -> Optional[Branch]:
+        """Looks up a branch by its full, Arabic or English name (case-insensitive)."""
+        return self._by_name.get(name.strip().casefold())
+
+    def by_server(self, server_name) -> Optional[Branch]:
+        """Looks up a branch by its server name, e.g. "BR50012-DOKKI"."""
+        return self._by_prefix.get(_server_prefix(server_name))
+
+    def by_channel(self, channel_database) -> Optional[Branch]:
+        """Looks up a branch by the Dynamics 365 channel database name, which contains the branch ID."""
+        key = _channel_key(channel_database)
+        return self._by_key.get(key) if key is not None else None
+
+    def display_name(self, branch_id, default="Unknown Branch"):
+        """Returns the "Arabic, English" name of a branch, or default when the ID is unknown."""
+        branch = self.by_id(branch_id)
+        return branch.display_name if branch is not None else default
@@ -5,29 +5,46 @@
 
 # from langchain.memory import ConversationBufferMemory
 # from langchain.prompts import PromptTemplate, ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
+# langchain_google_genai is imported in OthaimyChatbot.__init__ so loading this module stays cheap
 
 # from langchain.agents import initiakize_agent, Tool, AgentType
 from base import Base
+from answer_cache import AnswerCache, get_answer_cache
+from instrumentation import span
 
 SYSTEM_PROMPT = """
 You are Othaimy, an AI assistant designed to help Abdullah Al Othaim Markets Egypt employees 
 with application support, data analysis, and other operational tasks. 
 Your responses should be relevant to the operations, applications, and data of Abdullah Al Othaim Markets Egypt.
-You have access to an internal SQL database (AlOthaimApp) containing information 
-about branches, logfilesize, and backups for each branch. Answer questions based on 
-the data in the database accurately and concisely.  If you don't know the answer, say 
+You are given a digest of the latest AlOthaimApp checks below, covering sales uploads, 
+logfile sizes, and backups for each branch. Answer questions based on 
+the data in the digest accurately and concisely.  If you don't know the answer, say 
 "I'm sorry, I don't have enough information to answer that question."  Do not fabricate information.
 Respond in a clear and easy-to-understand manner. Use formatting (e.g., tables, lists, bullet points) 
 where appropriate to make the information more accessible.
+
+Latest fleet state:
+{digest}
 """
 
 
 
 class OthaimyChatbot(Base):
-    def __init__(self):
-        super().__init__()
-        self.llm = ChatGoogleGenerativeAI( model=self.model_name)
+    """
+    Othaimy chat assistant.
+
+    Any object with langchain's `invoke(prompt)` and `stream(prompt)` methods can be passed as `llm`,
+    e.g. a local fake model for offline benchmarks; Gemini is used by default. Every question is sent with
+    the fleet digest as system prompt, and answers are cached per normalized question and digest version
+    in the process-wide answer cache.
+    """
+    def __init__(self, context=None, llm=None):
+        super().__init__(context)
+        if llm is None:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            llm = ChatGoogleGenerativeAI( model=self.model_name)
+        self.llm = llm
+        self.answer_cache = get_answer_cache(**self.answer_cache_settings)
         # self.chatbot = ChatGoogleGenerativeAI(model=self.model_name)
         # self.base_memory = ConversationBufferMemory()
         # self.base_conversation = [
@@ -47,8 +64,41 @@ class OthaimyChatbot(Base):
         #                              verbose=True,
         #                              memory=self.memory)
 
+    def _prompt(self, user_input):
+        """Returns the answer cache key and the messages for a question, against the current fleet digest."""
+        version, digest = self.fleet_digest.render()
+        messages = [("system", SYSTEM_PROMPT.format(digest=digest)), ("human", user_input)]
+        return AnswerCache.key(user_input, version), messages
+
     def get_response(self, user_input):
-        return self.llm.invoke(user_input)
+        """
+        Returns the full answer to a question, from the answer cache when it was asked before
+        against the same fleet data.
+        """
+        key, messages = self._prompt(user_input)
+        answer = self.answer_cache.get(key)
+        if answer is None:
+            with span("llm.invoke"):
+                answer = self.llm.invoke(messages).content
+            self.answer_cache.put(key, answer)
+        return answer
+
+    def stream_response(self, user_input):
+        """
+        Yields the answer to a question as it is generated, for `st.write_stream`.
+        A cached answer is yielded at once; a new one is cached only once it has been streamed completely.
+        """
+        key, messages = self._prompt(user_input)
+        answer = self.answer_cache.get(key)
+        if answer is not None:
+            yield answer
+            return
+
+        chunks = []
+        for chunk in self.llm.stream(messages):
+            chunks.append(chunk.content)
+            yield chunk.content
+        self.answer_cache.put(key, "".join(chunks))
         
         # if not self.chain:
         #     return "Chatbot is not initialized correctly. Please check your API key."
@@ -66,4 +116,4 @@ if __name__ == '__main__':
     chatbot = OthaimyChatbot()
     query = "Summarize the key points of artificial intelligence in bullet points."
     response = chatbot.get_response(query)
-    print(response.content)
\ No newline at end of file
+    print(response)
\ No newline at end of file
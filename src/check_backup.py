@@ -1,107 +1,232 @@
 #! <D:\Heba\Practical\AlOthaimApp\src\check_backup.py>
 
 import pyodbc
-import pandas as pd
-import numpy as np
-import streamlit as st
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+import reachability
 from base import Base
+from branch_registry import BRANCH_UID, BRANCH_PWD
+from db_fetch import fetch_frame
+from instrumentation import span
 
 class BackupChecker(Base):
-    def __init__(self):
-        super().__init__()
-        self.bar = None
+    def __init__(self, context=None):
+        super().__init__(context)
 
-    def check_br_connection(self, br_name):
+    def branch_target(self, br_name):
         """
-        Checks the database connection for a given branch name.
-        Parameters:
-            br_name (str): The name of the branch to check the connection for.
-        Returns:
-            str: "Success" if the connection is successful, "Fail" otherwise.
+        Returns the (server address, ODBC connection string) of a branch server name.
+        Raises ValueError when the name is not in the registry and carries no branch number (e.g. "MAIN-SRV").
         """
+        branch = self.branch_registry.by_server(br_name)
+        if branch is not None:
+            return branch.server_ip, branch.connection_string
+
+        # Server not in branch_data.json yet, derive its address from the name
         br_number = int(br_name.split('-')[0].split("BR5")[-1])
         server = f"10.20.{br_number}.10"
         channel_connection = (
             f"DRIVER={{ODBC Driver 17 for SQL Server}};"
             f"SERVER={server};"
-            f"UID=itops;"
-            f"PWD=itops;"
+            f"UID={BRANCH_UID};"
+            f"PWD={BRANCH_PWD};"
         )
+        return server, channel_connection
+
+    def check_br_connection(self, br_name):
+        """
+        Checks the database connection for a given branch name.
+        Parameters:
+            br_name (str): The name of the branch to check the connection for.
+        Returns:
+            str: "Success" if the connection is successful, "Host Down" if the server can not be reached,
+                "Login Failed" if it refused the login, "Unknown Host" if the name maps to no server address.
+        """
+        try:
+            server, channel_connection = self.branch_target(br_name)
+        except ValueError as ex:
+            self.logger.warning(f"Can not resolve the address of {br_name}: {ex}")
+            return reachability.UNKNOWN_HOST
         
         try:
-            with pyodbc.connect(channel_connection) as conn:
+            # `timeout` bounds the ODBC login so a dead branch can not hold a worker forever
+            with span("probe", branch=br_name), pyodbc.connect(channel_connection, timeout=self.probe_timeout) as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT @@SERVERNAME")
                 output = cursor.fetchone()[0]
             
-            return "Success"
+            return reachability.SUCCESS
             
         except pyodbc.OperationalError as ex:
             self.logger.info(f"{server} is down! {ex}")
-            return "Fail"
-            
+            return reachability.HOST_DOWN
+        except pyodbc.Error as ex:
+            self.logger.info(f"{server} refused the login! {ex}")
+            return reachability.LOGIN_FAILED
+
+    def probe_branches(self, br_names, on_result=None):
+        """
+        Pings many branches and reports why each unreachable one failed.
+
+        When `probe_preflight` is on, one asyncio sweep first opens a TCP connection to the SQL Server port
+        of every branch at once; hosts that time out are "Host Down" and hosts that reset the connection are
+        "Port Closed". Only the reachable ones go on to the authenticated ODBC login, run concurrently with
+        at most `probe_workers` logins in flight.
+
+        Parameters:
+            br_names (Iterable[str]): Server names of the branches to ping.
+            on_result (callable, optional): Called as on_result(done, total, br_name, status) from the
+                calling thread each time a probe finishes, so UI updates stay on the script thread.
+        Returns:
+            list[str]: The ping status of each branch, in the same order as br_names.
+        """
+        br_names = list(br_names)
+        results = [reachability.HOST_DOWN] * len(br_names)
+        if not br_names:
+            return results
+        done = 0
+
+        pending = list(range(len(br_names)))
+        if self.probe_preflight:
+            # Resolve every target first; a name without a branch address fails on its own, not the whole check
+            servers = {}
+            for index, br_name in enumerate(br_names):
+                try:
+                    servers[index] = self.branch_target(br_name)[0]
+                except ValueError as ex:
+                    self.logger.warning(f"Can not resolve the address of {br_name}: {ex}")
+                    results[index] = reachability.UNKNOWN_HOST
+                    done += 1
+                    if on_result is not None:
+                        on_result(done, len(br_names), br_name, results[index])
+
+            with span("tcp.preflight", hosts=len(set(servers.values()))):
+                statuses = reachability.tcp_preflight(
+                    servers.values(), port=self.sql_port, timeout=self.preflight_timeout
+                )
+            pending = []
+            for index, server in servers.items():
+                if statuses[server] == reachability.REACHABLE:
+                    pending.append(index)
+                    continue
+                results[index] = statuses[server]
+                done += 1
+                if on_result is not None:
+                    on_result(done, len(br_names), br_names[index], results[index])
+            self.logger.info(f"TCP preflight: {len(pending)} of {len(br_names)} branches reachable")
+            if not pending:
+                return results
 
-    def check_last_backup_date(self):
+        workers = max(1, min(self.probe_workers, len(pending)))
+        # Overall deadline: every batch of workers may wait out one login timeout, plus some slack
+        rounds = -(-len(pending) // workers)
+        deadline = rounds * (self.probe_timeout + 1)
+
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="br-probe")
+        # Each probe runs in a copy of the caller's context so its span lands in the caller's run
+        futures = {
+            executor.submit(contextvars.copy_context().run, self.check_br_connection, br_names[i]): i
+            for i in pending
+        }
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as ex:
+                    self.logger.error(f"Probe of {br_names[index]} crashed: {ex}")
+                done += 1
+                if on_result is not None:
+                    on_result(done, len(br_names), br_names[index], results[index])
+        except FuturesTimeout:
+            stuck = [br_names[i] for f, i in futures.items() if not f.done()]
+            self.logger.warning(f"Probe deadline of {deadline}s exceeded, marking as down: {stuck}")
+        finally:
+            # Do not wait for stuck logins; their results are already counted as "Host Down"
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return results
+
+    def check_last_backup_date(self, progress=None, refresh=False):
         """
-        Connects to a SQL Server and retrieves the last backup date for a Review_Backup database from Staging Server(10.20.0.10).
+        Connects to the staging servers and retrieves the last backup date for a Review_Backup database from each of them
+        (Staging Server 10.20.0.10 unless several [[staging]] servers are configured).
         It also checks the connection status for branches with missed backups.
 
+        Staging servers are queried concurrently; when some of them do not answer, the branches of the others are
+        still returned and the missing ones are listed in the `attrs["unreachable_staging"]` of both DataFrames.
+
+        Results are shared through the query cache: concurrent sessions wait on one in-flight check and
+        reuse its result for `query_cache_ttl` seconds. The returned DataFrames must not be modified.
+
+        Parameters:
+            progress (callable, optional): Called as progress(percent, text) from the calling thread as the
+                check advances, e.g. to move a Streamlit progress bar or log to a terminal. The check itself
+                never touches Streamlit, so it also runs from the poller thread or the headless batch mode.
+            refresh (bool): Skip the cached result and query the staging server again.
+
         Returns (pd.DataFrames, pd.DataFrames): 
             Returns unhealthy branches (branches with missed backups), and healthy branches (branches with recent backups).
         """
-        self.logger.info(f"Connecting to SQL Server: {self.stag_connection}")
-        self.bar = st.progress(0)
-        
-        try:
-            with pyodbc.connect(self.stag_connection) as conn:
-                # Initialize healthy_branches as an empty DataFrame
-                healthy_branches = pd.DataFrame(columns=['Server ID', 'Last Backup Date'])
-                unhealthy_branches = pd.DataFrame(columns=['Server ID', 'Last Backup Date'])
-                
-                cursor = conn.cursor()
-                
-                sql1 = """SELECT * FROM Backup_DB ORDER BY server"""
+        return self.query_cache.get_or_compute(
+            ("backup", self.staging_endpoints),
+            lambda: self._check_last_backup_date(progress),
+            refresh=refresh,
+            # Partial results are not kept, so the next check retries the missing staging servers
+            should_cache=lambda result: result[0] is not None and not result[0].attrs.get("unreachable_staging"),
+        )
+
+    def _check_last_backup_date(self, progress=None):
+        self.logger.info(f"Connecting to staging servers: {', '.join(e.name for e in self.staging_endpoints)}")
+        # A local callback rather than instance state, so concurrent checks never share a progress sink
+        report = progress if progress is not None else (lambda value, text=None: None)
+        report(0)
+
+        def fetch(cursor):
+            sql1 = """SELECT * FROM Backup_DB ORDER BY server"""
+            with span("sql.execute", query="backup"):
                 cursor.execute(sql1)
-                all_data = cursor.fetchall()
-                healthy_branches = pd.DataFrame(np.array(all_data), columns=['Server ID', 'Last Backup Date'])
-                
-                sql2 = """SELECT * FROM BACKUP_DB WHERE DATEDIFF(HOUR, last_db_backup_date, GETDATE()) > 1"""
-                cursor.execute(sql2)
-                missed_data = cursor.fetchall()
-                
-                if missed_data:
-                    
-                    unhealthy_branches = pd.DataFrame(np.array(missed_data), columns=['Server ID', 'Last Backup Date'])
-                    self.bar.progress(50, text="Get Last Backup Date for all Branches")
-
-                    # Add column for the time difference from now till last backup
-                    now = pd.Timestamp.utcnow().tz_convert(self.cairo_tz)
-                    back_date = pd.to_datetime(unhealthy_branches['Last Backup Date']).dt.tz_localize(self.cairo_tz, ambiguous='NaT', nonexistent='shift_forward')
-                    unhealthy_branches['Time Difference'] = now - back_date
-                    self.logger.info(f"Missed Backup Branches: \n{unhealthy_branches}")
-
-                    # Check connection for unhealthy branches
-                    results = []
-                    progress = 50 + int(50 / len(unhealthy_branches['Server ID']))
-                    for br_name in unhealthy_branches['Server ID']:
-                        self.bar.progress(progress, text=f"Pinging {br_name}")
-                        result = self.check_br_connection(br_name)
-                        results.append(result)
-
-                    self.bar.progress(99, text="Checking Backup Completed ✅")
-                    unhealthy_branches['Ping Status'] = results
-                
-                    healthy_branches = healthy_branches[~healthy_branches['Server ID'].isin(unhealthy_branches['Server ID'])] if not unhealthy_branches.empty else all_branches
-                
-                healthy_branches.sort_values(by='Server ID', inplace=True)
-                unhealthy_branches.sort_values(by='Server ID', inplace=True)
-
-                self.logger.info(f"Number of Branches that take Backup: {len(healthy_branches)}")
-                self.logger.info(f"Missed Backup Branches: \n{unhealthy_branches}")
-                self.bar.progress(100)
-                
-                return healthy_branches, unhealthy_branches
+            return fetch_frame(cursor, columns=['Server ID', 'Last Backup Date'])
 
-        except pyodbc.OperationalError as ex:
-            self.logger.error(f"VPN is OFF: {ex}")
-            return None, None
\ No newline at end of file
+        all_branches, unreachable = self.query_staging(fetch)
+        if all_branches is None:
+            self.logger.error(f"VPN is OFF: no staging server answered ({', '.join(unreachable)})")
+            return None, None
+        report(50, text="Get Last Backup Date for all Branches")
+
+        # Age and severity of every branch's last backup in one vectorized pass,
+        # replacing the separate DATEDIFF(HOUR, ...) > 1 query
+        with span("pandas.transform", stage="backup"):
+            age = self.freshness.age(all_branches['Last Backup Date'])
+            severity = self.freshness.severity(age, "backup")
+            missed = severity > 0
+
+            healthy_branches = all_branches[~missed].copy()
+            unhealthy_branches = all_branches[missed].copy()
+        
+        if not unhealthy_branches.empty:
+
+            # Add column for the time difference from now till last backup
+            unhealthy_branches['Time Difference'] = age[missed]
+            unhealthy_branches['Severity'] = self.freshness.label(severity[missed])
+            self.logger.info(f"Missed Backup Branches: \n{unhealthy_branches}")
+
+            # Check connection for unhealthy branches concurrently, streaming into the progress bar
+            def on_result(done, total, br_name, status):
+                report(50 + int(49 * done / total), text=f"Pinged {br_name}: {status} ({done}/{total})")
+
+            results = self.probe_branches(unhealthy_branches['Server ID'], on_result=on_result)
+
+            report(99, text="Checking Backup Completed ✅")
+            unhealthy_branches['Ping Status'] = results
+        
+        healthy_branches.sort_values(by='Server ID', inplace=True)
+        unhealthy_branches.sort_values(by='Server ID', inplace=True)
+        healthy_branches.attrs["unreachable_staging"] = unreachable
+        unhealthy_branches.attrs["unreachable_staging"] = unreachable
+
+        self.logger.info(f"Number of Branches that take Backup: {len(healthy_branches)}")
+        self.logger.info(f"Missed Backup Branches: \n{unhealthy_branches}")
+        report(100)
+        
+        return healthy_branches, unhealthy_branches
\ No newline at end of file
@@ -1,47 +1,159 @@
 #! <D:\Heba\Practical\AlOthaimApp\src\check_logsize.py>
 
-import pyodbc
 import pandas as pd
-import numpy as np
 from base import Base
+from db_fetch import fetch_frame
+from instrumentation import span
+
+# Log size in GB rounded like the page shows it, so the server-side flag matches the displayed value
+_SIZE_GB = "ROUND(SizeMB/1024.0, 2)"
 
 class CheckLogSize(Base):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, context=None):
+        super().__init__(context)
 
-    def check_logfile_size(self):
+    def check_logfile_size(self, refresh=False, top_n=None):
         """
         Connects to a SQL Server and retrieves the logfile size for each specific channel database.
         This method checks the log file size for each branch and categorizes them into healthy and large log branches.
+
+        Results are shared through the query cache like `BackupChecker.check_last_backup_date`;
+        pass refresh=True to skip the cached result. Every staging server is queried concurrently, and
+        staging servers that did not answer are listed in `attrs["unreachable_staging"]` of both DataFrames.
+
+        Parameters:
+            refresh (bool): Skip the cached result.
+            top_n (int, optional): Only fetch the N largest log files, defaults to [logsize_checker].top_n
+                (0 fetches every branch).
+        """
+        top_n = self.logsize_top_n if top_n is None else top_n
+        return self.query_cache.get_or_compute(
+            ("logsize", self.staging_endpoints, top_n),
+            lambda: self._check_logfile_size(top_n),
+            refresh=refresh,
+            # Partial results are not kept, so the next check retries the missing staging servers
+            should_cache=lambda result: result is not None and not result[0].attrs.get("unreachable_staging"),
+        )
+
+    def _severity_case(self):
+        """
+        Builds the CASE expression computing the severity code on the server, with the
+        [freshness] log size thresholds as parameters (same buckets as FreshnessEngine.severity).
+        """
+        thresholds = [float(t) for t in self.freshness.thresholds["logsize"]]
+        whens = [f"WHEN {_SIZE_GB} IS NULL THEN {len(thresholds)}"]
+        # Highest threshold first, a size above the i-th threshold gets severity i + 1
+        whens += [f"WHEN {_SIZE_GB} > ? THEN {i + 1}" for i in reversed(range(len(thresholds)))]
+        return f"CASE {' '.join(whens)} ELSE 0 END", thresholds[::-1]
+
+    def fetch_logfile_page(self, cursor, after=None, page_size=1000):
+        """
+        Fetches one page of classified log files ordered by server and file, using keyset pagination.
+
+        A server can have several log files, so the key is (Server, physical_name); paging on the server
+        alone would skip the files of a server split across a page boundary.
+
+        Parameters:
+            cursor (pyodbc.Cursor): Cursor on the staging server.
+            after (tuple[str, str], optional): (Server, physical_name) of the last row of the previous page,
+                None for the first page.
+            page_size (int): Maximum rows in the page.
+        Returns (pd.DataFrame):
+            Columns Server ID, Size (GB), File Path and the int Severity code.
+        """
+        case, params = self._severity_case()
+        keyset = "WHERE Server > ? OR (Server = ? AND physical_name > ?)" if after is not None else ""
+        sql = f"""SELECT TOP (?) Server, {_SIZE_GB} AS SizeGB, physical_name, {case} AS Severity
+                  FROM logfile_size {keyset}
+                  ORDER BY Server, physical_name"""
+        params = [page_size, *params]
+        if after is not None:
+            params += [after[0], after[0], after[1]]
+        with span("sql.execute", query="logsize.page"):
+            cursor.execute(sql, *params)
+        return fetch_frame(cursor, columns=['Server ID', 'Size (GB)', 'File Path', 'Severity'])
+
+    def fetch_largest_logfiles(self, cursor, top_n):
+        """
+        Fetches the `top_n` largest log files with their severity code, largest first.
         """
-        self.logger.info(f"Connecting to SQL Server: {self.stag_connection}")
-
-        try:
-            with pyodbc.connect(self.stag_connection) as conn:
-                cursor = conn.cursor()
-                # SQL query to fetch branches with log file size greater than the specified limit
-                sql1 = """SELECT Server, SizeMB/1024, physical_name FROM logfile_size WHERE SizeMB > ?*1024"""
-                cursor.execute(sql1, self.logsize_limit)
-                data = cursor.fetchall()
-                large_log_branches = pd.DataFrame(np.array(data), columns=['Server ID', 'Size (GB)', 'File Path'])
-                
-                # SQL query to fetch all branches ordered by server
-                sql2 = """SELECT Server, SizeMB/1024, physical_name FROM logfile_size ORDER BY Server"""
-                cursor.execute(sql2)
-                data = cursor.fetchall()
-                tmp = pd.DataFrame(np.array(data), columns=['Server ID', 'Size (GB)', 'File Path'])
-                
-                # Filter out branches with large log files to get healthy branches
-                healthy_branches = tmp[~tmp['Server ID'].isin(large_log_branches['Server ID'])]
-                
-            healthy_branches.sort_values('Server ID', inplace=True)
-            large_log_branches.sort_values('Server ID', inplace=True)
-
-            self.logger.info(f"Number of Healthy Log file Branches: {len(healthy_branches)}")
-            self.logger.info(f"Number of un-Healthy Log file Branches: {len(large_log_branches)}")
-
-            return healthy_branches, large_log_branches
-
-        except pyodbc.OperationalError as ex:
-            self.logger.error(f"VPN is OFF: {ex}")
-            return None
\ No newline at end of file
+        case, params = self._severity_case()
+        sql = f"""SELECT TOP (?) Server, {_SIZE_GB} AS SizeGB, physical_name, {case} AS Severity
+                  FROM logfile_size
+                  ORDER BY SizeGB DESC, Server"""
+        with span("sql.execute", query="logsize.top"):
+            cursor.execute(sql, top_n, *params)
+        return fetch_frame(cursor, columns=['Server ID', 'Size (GB)', 'File Path', 'Severity'])
+
+    def _fetch_logfiles(self, cursor, top_n=0):
+        """Fetches the classified log files of one staging server, every page of them or the `top_n` largest."""
+        if top_n:
+            return self.fetch_largest_logfiles(cursor, top_n)
+
+        # Walk the table in keyset pages so no single result set holds the whole fleet
+        pages, after = [], None
+        while True:
+            page = self.fetch_logfile_page(cursor, after, self.logsize_page_size)
+            pages.append(page)
+            if len(page) < self.logsize_page_size:
+                break
+            after = (page['Server ID'].iloc[-1], page['File Path'].iloc[-1])
+        return pd.concat(pages, ignore_index=True) if len(pages) > 1 else pages[0]
+
+    def browse_logfiles(self, after=None, page_size=None):
+        """
+        Returns one page of every staging server's log files, for browsing the table without reading it all.
+
+        Every staging server returns its next page_size + 1 rows after the cursor; the merged rows are cut
+        to one page, so rows of a server beyond the cut are simply fetched again with the next page.
+
+        Parameters:
+            after (tuple[str, str], optional): Cursor returned with the previous page, None for the first page.
+            page_size (int, optional): Rows per page, defaults to [logsize_checker].page_size.
+        Returns (pd.DataFrame | None, tuple | None):
+            The page with labelled Severity (None when no staging server answered), and the cursor of
+            the next page (None on the last page).
+        """
+        page_size = page_size or self.logsize_page_size
+        page, unreachable = self.query_staging(lambda cursor: self.fetch_logfile_page(cursor, after, page_size + 1))
+        if page is None:
+            self.logger.error(f"VPN is OFF: no staging server answered ({', '.join(unreachable)})")
+            return None, None
+
+        page = page.sort_values(['Server ID', 'File Path']).reset_index(drop=True)
+        has_more = len(page) > page_size
+        page = page.head(page_size).copy()
+        page['Severity'] = self.freshness.label(page['Severity'].to_numpy())
+        page.attrs["unreachable_staging"] = unreachable
+        next_after = (page['Server ID'].iloc[-1], page['File Path'].iloc[-1]) if has_more else None
+        return page, next_after
+
+    def _check_logfile_size(self, top_n=0):
+        self.logger.info(f"Connecting to staging servers: {', '.join(e.name for e in self.staging_endpoints)}")
+
+        all_branches, unreachable = self.query_staging(lambda cursor: self._fetch_logfiles(cursor, top_n))
+        if all_branches is None:
+            self.logger.error(f"VPN is OFF: no staging server answered ({', '.join(unreachable)})")
+            return None
+
+        with span("pandas.transform", stage="logsize"):
+            if len(self.staging_endpoints) > 1:
+                # Each staging server returned its own page order or top N, merge them into one
+                if top_n:
+                    all_branches = all_branches.sort_values(['Size (GB)', 'Server ID'], ascending=[False, True]).head(top_n)
+                else:
+                    all_branches = all_branches.sort_values(['Server ID', 'File Path'])
+
+            # The server already classified every branch, only the split and the labels are left
+            severity = all_branches.pop('Severity').to_numpy()
+            large = severity > 0
+            healthy_branches = all_branches[~large].copy()
+            large_log_branches = all_branches[large].copy()
+            large_log_branches['Severity'] = self.freshness.label(severity[large])
+            healthy_branches.attrs["unreachable_staging"] = unreachable
+            large_log_branches.attrs["unreachable_staging"] = unreachable
+
+        self.logger.info(f"Number of Healthy Log file Branches: {len(healthy_branches)}")
+        self.logger.info(f"Number of un-Healthy Log file Branches: {len(large_log_branches)}")
+
+        return healthy_branches, large_log_branches
@@ -0,0 +1,164 @@
+#! <D:\Heba\Practical\AlOthaimApp\src\context.py>
+
+import pytz
+import logging
+import os
+import threading
+import toml
+from functools import cached_property
+from dotenv import load_dotenv
+from app_logging import setup_logging
+from branch_registry import BranchRegistry
+from instrumentation import configure_tracer
+from staging import staging_endpoints
+
+
+class AppContext:
+    """
+    Settings and resources shared by every checker: configuration, database connection details,
+    the branch registry and the application logger.
+
+    It is built once per process by `get_context()`. Streamlit reruns and every `Base` subclass
+    reuse the same instance instead of re-reading `.env`, `config.toml` and `branch_data.json`.
+    """
+
+    def __init__(self):
+
+        # Load environment variables
+        env_path = os.path.join("..", ".env")
+        load_dotenv(env_path)
+
+        try:
+            # Load Configuration file
+            config = toml.load('.streamlit/config.toml')
+            self.br_name = config['new_branch'].get('br_name', '')
+            self.br_date = config['new_branch'].get('br_date', '')
+            self.logsize_limit = config['new_branch'].get('logsize_limit', 20)
+            # Seconds without checklist changes before they are saved automatically, 0 disables write-behind
+            self.write_behind = config['new_branch'].get('write_behind', 0)
+
+            # Branch probing settings (number of parallel pings and login timeout in seconds)
+            self.probe_workers = config.get('backup_checker', {}).get('probe_workers', 8)
+            self.probe_timeout = config.get('backup_checker', {}).get('probe_timeout', 5)
+            # TCP reachability sweep of the branch SQL Server ports before any ODBC login
+            self.probe_preflight = config.get('backup_checker', {}).get('preflight', True)
+            self.preflight_timeout = config.get('backup_checker', {}).get('preflight_timeout', 1.0)
+            self.sql_port = config.get('backup_checker', {}).get('sql_port', 1433)
+
+            # Staging server connection pool settings
+            self.pool_settings = {
+                'max_size': config.get('staging_pool', {}).get('max_size', 5),
+                'idle_timeout': config.get('staging_pool', {}).get('idle_timeout', 300),
+                'checkout_timeout': config.get('staging_pool', {}).get('checkout_timeout', 30),
+            }
+
+            # Seconds a staging-server health query result is reused across sessions
+            self.query_cache_ttl = config.get('query_cache', {}).get('ttl', 60)
+
+            # Log size check: rows per keyset page, and the number of largest log files to fetch (0 = all)
+            self.logsize_page_size = config.get('logsize_checker', {}).get('page_size', 1000)
+            self.logsize_top_n = config.get('logsize_checker', {}).get('top_n', 0)
+
+            # Processes parsing uploaded sales workbooks in parallel
+            self.parse_workers = config.get('upload_cache', {}).get('parse_workers', 4)
+            # Directory of the Parquet copies of parsed Excel uploads, empty to disable (needs pyarrow)
+            self.converted_upload_dir = config.get('upload_cache', {}).get('converted_dir', 'cache/uploads')
+            # Days a Parquet copy is kept after its last use, like the log files (0 keeps them forever)
+            self.converted_retention_days = config.get('upload_cache', {}).get(
+                'converted_retention_days', config.get('logger', {}).get('retention_days', 30))
+
+            # Processed sales upload cache limits
+            self.upload_cache_settings = {
+                'max_entries': config.get('upload_cache', {}).get('max_entries', 8),
+                'max_bytes': config.get('upload_cache', {}).get('max_mb', 64) * 1024 * 1024,
+            }
+
+            # load LLM model from the configuration file
+            self.model_name = config['othaimy_chatbot'].get('model_name', 'gemini-1.5-flash')
+            self.temperature= config['othaimy_chatbot'].get('temperature', 1)
+            # Token budget of the fleet digest given to the chatbot as context
+            self.digest_tokens = config['othaimy_chatbot'].get('digest_tokens', 1500)
+            # Answers are reused for the same question and fleet snapshot until they are `ttl` seconds old
+            self.answer_cache_settings = {
+                'max_entries': config['othaimy_chatbot'].get('cache_entries', 256),
+                'ttl': config['othaimy_chatbot'].get('cache_ttl', 900),
+            }
+
+            # Load database connection details from environment variables
+            self.server_ip = os.getenv('DB_SERVER_IP', "10.20.0.10")
+            self.db_name = os.getenv('DB_NAME', "AlOthaimApp")
+            self.uid = os.getenv('DB_USERNAME', "sa")
+            self.pwd = os.getenv('DB_PASSWORD', "sa")
+
+            # Load Google API Key for Gemini from environment variables
+            self.api_key = os.getenv('GEMINI_API_KEY', '')
+
+        except Exception as e:
+            logging.error(f"Error loading configuration file or environment variables: {e}. Using default values.")
+            config = {}
+            self.br_name = ''
+            self.br_date = ''
+            self.logsize_limit = 50
+            self.write_behind = 0
+            self.probe_workers = 8
+            self.probe_timeout = 5
+            self.probe_preflight = True
+            self.preflight_timeout = 1.0
+            self.sql_port = 1433
+            self.pool_settings = {'max_size': 5, 'idle_timeout': 300, 'checkout_timeout': 30}
+            self.query_cache_ttl = 60
+            self.logsize_page_size = 1000
+            self.logsize_top_n = 0
+            self.parse_workers = 4
+            self.converted_upload_dir = 'cache/uploads'
+            self.converted_retention_days = 30
+            self.upload_cache_settings = {'max_entries': 8, 'max_bytes': 64 * 1024 * 1024}
+            self.model_name = 'gemini-1.5-flash'
+            self.temperature = 1
+            self.digest_tokens = 1500
+            self.answer_cache_settings = {'max_entries': 256, 'ttl': 900}
+            self.server_ip = "10.20.0.10"
+            self.db_name = "AlOthaimApp"
+            self.uid = "sa"
+            self.pwd = "sa"
+            self.api_key = os.getenv('GEMINI_API_KEY', '')
+
+        self.config = config
+
+        # Staging servers queried for Backup_DB and logfile_size; the first one also holds OpenBranchSteps
+        self.staging_endpoints = staging_endpoints(config, self.server_ip, self.db_name, self.uid, self.pwd)
+        self.stag_connection = self.staging_endpoints[0].connection_string
+
+        # Set up logger, records go through the process-wide queue to a rotating file
+        self.cairo_tz = pytz.timezone('Africa/Cairo')
+        setup_logging(config)
+        self.logger = logging.getLogger("base")
+        # Span recorder behind the diagnostics page and the Prometheus metrics file
+        self.tracer = configure_tracer(config)
+
+        # Load Branches data from json file
+        self.branch_data_file = os.path.join("assets", "branch_data.json")
+        self.branch_data_file = os.path.abspath(self.branch_data_file)
+        with open(self.branch_data_file, "rb") as f:
+            # Indexed once here and shared by every checker; its version changes whenever the file is edited
+            self.branch_registry = BranchRegistry.from_json_bytes(f.read())
+
+    @cached_property
+    def freshness(self):
+        """Severity thresholds shared by the sales, backup and log size checks, built on first use (needs pandas)."""
+        from freshness import FreshnessEngine
+        return FreshnessEngine(self.config, self.cairo_tz, self.logsize_limit)
+
+
+_context = None
+_context_lock = threading.Lock()
+
+
+def get_context():
+    """Returns the process-wide application context, building it on first use."""
+    global _context
+    if _context is None:
+        with _context_lock:
+            if _context is None:
+                _context = AppContext()
+    return _context
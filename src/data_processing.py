@@ -1,87 +1,399 @@
 #! <AlOthaimApp/src/data_processing.py>
+import io
+import os
+import time
+import zipfile
+import threading
+import multiprocessing
 import pandas as pd
-from datetime import timedelta
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
 
 from base import Base
+import upload_cache
+from upload_cache import content_hash, get_upload_cache
+from instrumentation import span, traced
+
+REQUIRED_COLUMNS = ("Channel database", "Date uploaded", "Status")
+
+# Raised by openpyxl for a corrupt upload or one that is not an .xlsx workbook
+INVALID_WORKBOOK_ERRORS = (zipfile.BadZipFile, InvalidFileException)
+
+
+def _to_timestamp(value):
+    """Converts an Excel cell value to a pd.Timestamp, or None when it is not a valid date."""
+    if isinstance(value, datetime):
+        return pd.Timestamp(value)
+    if value is None:
+        return None
+    try:
+        stamp = pd.Timestamp(value)
+    except (ValueError, TypeError):
+        return None
+    return None if pd.isna(stamp) else stamp
+
+
+def read_latest_uploads(source, stats=None):
+    """
+    Streams the Upload Sessions workbook with openpyxl in read-only mode and keeps only the
+    latest "Applied" upload per channel database, so memory grows with the number of branches
+    rather than with the number of rows in the export.
+
+    Parameters:
+        source (str | file-like): Path or file object of the .xlsx export.
+        stats (dict, optional): Receives the number of data rows read under "rows".
+
+    Return (pd.DataFrame): One row per channel database with columns "Channel database" and "Date uploaded".
+
+    Raises:
+        pd.errors.EmptyDataError: If the sheet has no data rows.
+        ValueError: If any of the required columns is missing from the header row.
+        zipfile.BadZipFile, InvalidFileException: If the file is not a valid .xlsx workbook.
+    """
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        header = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), None)
+        if header is None:
+            raise pd.errors.EmptyDataError("Uploaded Excel file contains no data")
+
+        positions = {}
+        for index, name in enumerate(header):
+            if name in REQUIRED_COLUMNS and name not in positions:
+                positions[name] = index
+        missing_cols = set(REQUIRED_COLUMNS) - set(positions)
+        if missing_cols:
+            raise ValueError(f"Excel file missing required columns: {missing_cols}")
+
+        channel_idx, date_idx, status_idx = (positions[name] for name in REQUIRED_COLUMNS)
+        width = max(positions.values()) + 1
+        # Only the data rows, and only up to the last required column, are decoded
+        rows = sheet.iter_rows(min_row=2, max_col=width, values_only=True)
+
+        latest = {}
+        row_count = 0
+        for row in rows:
+            if not any(cell is not None for cell in row):
+                continue  # Read-only sheets may report trailing blank rows
+            row_count += 1
+            if len(row) < width or row[status_idx] != "Applied" or row[channel_idx] is None:
+                continue
+            uploaded = _to_timestamp(row[date_idx])
+            if uploaded is None:
+                continue
+            current = latest.get(row[channel_idx])
+            # ">=" keeps the later row on ties, like a stable sort followed by keep='last'
+            if current is None or uploaded >= current:
+                latest[row[channel_idx]] = uploaded
+
+        if not row_count:
+            raise pd.errors.EmptyDataError("Uploaded Excel file contains no data")
+    finally:
+        workbook.close()
+
+    if stats is not None:
+        stats["rows"] = row_count
+
+    return pd.DataFrame({"Channel database": list(latest.keys()), "Date uploaded": list(latest.values())})
+
+
+def _latest_from_frame(df, stats=None, file_type="CSV"):
+    """
+    Applies the rules of `read_latest_uploads` to an export loaded as a whole DataFrame (CSV or Parquet):
+    the same required columns and errors, and the latest "Applied" upload per channel database.
+    `file_type` names the export in the error messages.
+    """
+    missing_cols = set(REQUIRED_COLUMNS) - set(df.columns)
+    if missing_cols:
+        raise ValueError(f"{file_type} file missing required columns: {missing_cols}")
+
+    df = df.loc[:, list(REQUIRED_COLUMNS)].dropna(how="all")
+    if df.empty:
+        raise pd.errors.EmptyDataError(f"Uploaded {file_type} file contains no data")
+    if stats is not None:
+        stats["rows"] = len(df)
+
+    uploaded = pd.to_datetime(df["Date uploaded"], errors="coerce", format="mixed")
+    applied = df.assign(**{"Date uploaded": uploaded})
+    applied = applied[(applied["Status"] == "Applied") & applied["Channel database"].notna() & uploaded.notna()]
+
+    # A stable sort keeps file order on ties, so keep='last' matches the streaming reader
+    latest = (applied.sort_values("Date uploaded", kind="stable")
+              .drop_duplicates(subset=["Channel database"], keep="last"))
+    return latest[["Channel database", "Date uploaded"]].reset_index(drop=True)
+
+
+def read_latest_uploads_csv(source, stats=None):
+    """CSV export of the Upload Sessions screen, see `read_latest_uploads`."""
+    try:
+        df = pd.read_csv(source, usecols=lambda name: name in REQUIRED_COLUMNS, dtype={"Status": "string"})
+    except pd.errors.EmptyDataError:
+        raise pd.errors.EmptyDataError("Uploaded CSV file contains no data")
+    return _latest_from_frame(df, stats, "CSV")
+
+
+def read_latest_uploads_parquet(source, stats=None):
+    """Parquet export of the Upload Sessions screen, see `read_latest_uploads`. Needs pyarrow."""
+    if upload_cache.pq is None:
+        raise ValueError("Parquet uploads need pyarrow installed")
+    names = set(upload_cache.pq.ParquetFile(source).schema_arrow.names)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    # Only the required columns are read from the columnar file
+    df = pd.read_parquet(source, columns=[name for name in REQUIRED_COLUMNS if name in names])
+    return _latest_from_frame(df, stats, "Parquet")
+
+
+# Upload readers by file extension, every reader applies the same validation rules
+UPLOAD_READERS = {
+    ".xlsx": read_latest_uploads,
+    ".csv": read_latest_uploads_csv,
+    ".parquet": read_latest_uploads_parquet,
+}
+
+
+def reader_for(name):
+    """Returns the upload reader for a file name, Excel being the default."""
+    return UPLOAD_READERS.get(os.path.splitext(str(name))[1].lower(), read_latest_uploads)
+
+
+def parse_upload(data, name="upload.xlsx", digest=None, converted_dir=None):
+    """
+    Parses one uploaded export from its bytes; runs in the parse process pool.
+
+    An Excel workbook is converted once to a Parquet copy under `converted_dir`, keyed by its content
+    hash, so analysing the same export again (even after a restart) skips Excel parsing.
+
+    Return (pd.DataFrame, int, float): Latest upload per channel database, data rows read and parse seconds.
+    """
+    start = time.perf_counter()
+    reader = reader_for(name)
+    path = None
+    if reader is read_latest_uploads and converted_dir and digest:
+        path = upload_cache.converted_path(converted_dir, digest)
+        converted = upload_cache.load_converted(path)
+        if converted is not None:
+            df, rows = converted
+            return df, rows, time.perf_counter() - start
+
+    stats = {}
+    df = reader(io.BytesIO(data), stats)
+    if path is not None:
+        upload_cache.save_converted(path, df, stats["rows"])
+    return df, stats["rows"], time.perf_counter() - start
+
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool(workers=4):
+    """
+    Returns the process-wide pool parsing uploaded workbooks, creating it on first use.
+    Excel parsing is CPU-bound, so separate processes parse several files truly in parallel.
+    """
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            # "spawn" so workers do not inherit the Streamlit server threads and locks
+            _parse_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _parse_pool
+
+
+def reset_parse_pool(broken):
+    """Discards a parse pool whose worker died, so the next `get_parse_pool` call builds a new one."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is broken:
+            _parse_pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
 
 
 class DataProcessor(Base):
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, context=None):
+        super().__init__(context)
 
     def get_branch_name(self, branch_id):
         """This method returns the branch English and Arabic name for a given branch ID."""
-        return self.branch_data.get(str(branch_id), "Unknown Branch")
+        return self.branch_registry.display_name(str(branch_id))
 
+    @traced("pandas.transform", stage="process_data")
     def process_data(self, uploaded_file):
         """
-        Processes uploaded Excel data and returns a DataFrame following these steps:
-            1. Reads the Excel file.
-            2. Checks for required columns.
-            3. Filters and processes the data.
+        Processes uploaded Excel, CSV or Parquet data and returns a DataFrame following these steps:
+            1. Reads the file with the reader for its extension, reading only the required columns.
+            2. Keeps the latest "Applied" upload per channel database while reading.
+            3. Processes the remaining data.
 
         Return (pd.DataFrame): Processed DataFrame with branch upload status
         """
-        required_columns = {"Channel database", "Date uploaded", "Status"}
-
         try:
-            df = pd.read_excel(uploaded_file)
-            if df.empty:
-                self.logger.error("Uploaded Excel file is empty")
-                raise pd.errors.EmptyDataError(
-                    "Uploaded Excel file contains no data")
-
-            # Check for required columns
-            missing_cols = required_columns - set(df.columns)
-            if missing_cols:
-                self.logger.error(f"Missing required columns: {missing_cols}")
-                raise ValueError(
-                    f"Excel file missing required columns: {missing_cols}")
-            else:
-                self.logger.info("Excel file successfully loaded")
+            with span("excel.parse"):
+                df_filtered = reader_for(getattr(uploaded_file, "name", uploaded_file))(uploaded_file)
+            self.logger.info("Excel file successfully loaded")
 
-            # Filter needed columns only
-            df = df[list(required_columns)]
-            # Filter rows where the status is 'Applied' and drop the 'Status' column
-            df_filtered = df[df["Status"] == "Applied"].drop(columns=["Status"])
-            
-            # Convert 'Date uploaded' to datetime and localize to Cairo timezone
-            time_now = pd.Timestamp.utcnow().tz_convert(self.cairo_tz)
-            df_filtered["Uploaded Date"] = pd.to_datetime(df_filtered["Date uploaded"], errors='coerce')
-            df_filtered["Uploaded Date"] = df_filtered["Uploaded Date"].dt.tz_localize(self.cairo_tz, ambiguous='NaT')
-            df_filtered = df_filtered.dropna(subset=["Uploaded Date"]) # Drop rows with invalid dates
+            return self.prepare_uploads(df_filtered)
 
-            # Extract Branch ID from the index and convert it to string
-            df_filtered["Branch ID"] = df_filtered["Channel database"].str.extract(r"(\d+)")[0].astype(str)
+        except pd.errors.EmptyDataError as e:
+            self.logger.error(f"Empty Excel file: {e}")
+            return 'Empty Excel file'
+        except (ValueError, *INVALID_WORKBOOK_ERRORS) as e:
+            self.logger.error(f"Invalid data format: {e}")
+            return 'Invalid data format'
 
-            if df_filtered.empty:
-                self.logger.error("No valid data remains after filtering")
-                return "No valid branch upload data found after processing"
+    def prepare_uploads(self, df_filtered):
+        """
+        Adds the upload time, branch ID and time difference to the latest uploads read from a workbook.
 
-            df_filtered = (df_filtered.sort_values(by=["Channel database", "Uploaded Date"])
-                           .drop_duplicates(subset=["Channel database"], keep='last')
-                           .reset_index(drop=True))
+        Return (pd.DataFrame | str): Processed DataFrame, or a message when no valid upload remains.
+        """
+        # Convert 'Date uploaded' to datetime and localize to Cairo timezone
+        df_filtered["Uploaded Date"] = pd.to_datetime(df_filtered["Date uploaded"], errors='coerce')
+        df_filtered["Uploaded Date"] = df_filtered["Uploaded Date"].dt.tz_localize(self.cairo_tz, ambiguous='NaT')
+        df_filtered = df_filtered.dropna(subset=["Uploaded Date"]) # Drop rows with invalid dates
+
+        # Resolve the Branch ID through the branch registry; channels of branches it does not know
+        # keep the digits of their name, so they are still reported
+        channels = df_filtered["Channel database"].astype(str)
+        resolved = channels.map(lambda channel: getattr(self.branch_registry.by_channel(channel), "key", None))
+        df_filtered["Branch ID"] = resolved.fillna(channels.str.extract(r"(\d+)")[0].astype(str))
+
+        if df_filtered.empty:
+            self.logger.error("No valid data remains after filtering")
+            return "No valid branch upload data found after processing"
 
-            # Calculate time difference
-            df_filtered["Time Difference"] = time_now - df_filtered["Uploaded Date"]
+        df_filtered = (df_filtered.sort_values(by=["Channel database", "Uploaded Date"])
+                       .drop_duplicates(subset=["Channel database"], keep='last')
+                       .reset_index(drop=True))
 
-            self.logger.info("Data processed successfully")
-            
-            return df_filtered
+        # Calculate time difference
+        df_filtered["Time Difference"] = self.freshness.age(df_filtered["Uploaded Date"])
+
+        self.logger.info("Data processed successfully")
+        
+        return df_filtered
 
+    def load_uploads(self, uploaded_files):
+        """
+        Processes several uploaded workbooks, parsing the ones not in the upload cache in parallel.
+
+        Files already processed (same content hash and branch registry version) come from the upload cache.
+        A single new file is parsed in this process; several are parsed in the parse process pool.
+
+        Return (list[pd.DataFrame], pd.DataFrame): Processed DataFrame of every valid file, and a report with
+            the file name, data rows, branches, parse seconds and status of each file.
+        """
+        cache = get_upload_cache(**self.upload_cache_settings)
+        frames, report, pending = [], [], {}
+
+        for uploaded_file in uploaded_files:
+            data = uploaded_file.getvalue()
+            key = (content_hash(data), self.branch_registry.version)
+            cached = cache.get(key)
+            if cached is not None:
+                self.logger.info(f"Reusing processed upload {key[0][:12]} from cache")
+                frames.append(cached)
+                report.append((uploaded_file.name, cached.attrs.get("rows"), len(cached), 0.0, "Cached"))
+            else:
+                pending[uploaded_file.name, key] = data
+
+        if pending and self.converted_upload_dir:
+            upload_cache.purge_converted(self.converted_upload_dir, self.converted_retention_days)
+
+        if len(pending) == 1:
+            ((name, key), data), = pending.items()
+            outcomes = {(name, key): self._parse_outcome(
+                lambda: parse_upload(data, name, key[0], self.converted_upload_dir))}
+        elif pending:
+            pool = get_parse_pool(self.parse_workers)
+            with span("excel.parse", files=len(pending)):
+                futures = {}
+                for (name, key), data in pending.items():
+                    try:
+                        futures[name, key] = pool.submit(parse_upload, data, name, key[0], self.converted_upload_dir)
+                    except BrokenProcessPool:
+                        # A worker died since the last upload, parse in a fresh pool
+                        self.logger.warning("Upload parser pool is broken, starting a new one")
+                        reset_parse_pool(pool)
+                        pool = get_parse_pool(self.parse_workers)
+                        futures[name, key] = pool.submit(parse_upload, data, name, key[0], self.converted_upload_dir)
+                outcomes = {entry: self._parse_outcome(future.result, pool) for entry, future in futures.items()}
+        else:
+            outcomes = {}
+
+        for (name, key), outcome in outcomes.items():
+            if isinstance(outcome, str):
+                report.append((name, None, 0, None, outcome))
+                continue
+            df_filtered, rows, seconds = outcome
+            processed = self.prepare_uploads(df_filtered)
+            if isinstance(processed, str):
+                report.append((name, rows, 0, round(seconds, 3), processed))
+                continue
+            processed.attrs["rows"] = rows
+            cache.put(key, processed)
+            frames.append(processed)
+            report.append((name, rows, len(processed), round(seconds, 3), "Parsed"))
+
+        report = pd.DataFrame(report, columns=["File", "Rows", "Branches", "Parse (s)", "Status"])
+        return frames, report
+
+    def _parse_outcome(self, parse, pool=None):
+        """
+        Runs a parse and turns its errors into the status of that file, so one bad upload never fails the others.
+        A worker that died breaks the whole parse `pool`, which is then replaced for the next uploads.
+        """
+        try:
+            return parse()
         except pd.errors.EmptyDataError as e:
             self.logger.error(f"Empty Excel file: {e}")
             return 'Empty Excel file'
-        except ValueError as e:
+        except (ValueError, *INVALID_WORKBOOK_ERRORS) as e:
             self.logger.error(f"Invalid data format: {e}")
             return 'Invalid data format'
+        except BrokenProcessPool as e:
+            self.logger.error(f"Upload parser process died: {e}")
+            if pool is not None:
+                reset_parse_pool(pool)
+            return 'Parser crashed, upload the file again'
+        except Exception as ex:
+            self.logger.error(f"Could not read the upload: {ex}")
+            return 'Could not read file'
 
+    def analyze_uploads(self, uploaded_files):
+        """
+        Reconciles several uploaded workbooks (e.g. several days or regions) into one view holding
+        the latest upload per branch, and splits it into uploaded and missed branches.
 
+        "Time Difference" and the missed-branch check are recomputed against the current clock on every call.
+
+        Return (pd.DataFrame, pd.DataFrame, pd.DataFrame): Uploaded and missed branches, or (None, None) when
+            no file is valid, followed by the per-file report of `load_uploads`.
+        """
+        frames, report = self.load_uploads(uploaded_files)
+        if not frames:
+            return None, None, report
+
+        with span("pandas.transform", stage="merge_uploads", files=len(frames)):
+            merged = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+            merged = (merged.sort_values(by=["Channel database", "Uploaded Date"])
+                      .drop_duplicates(subset=["Channel database"], keep='last')
+                      .reset_index(drop=True))
+            merged["Time Difference"] = self.freshness.age(merged["Uploaded Date"])
+
+        uploaded, missed = self.check_missing_branches(merged)
+        self.fleet_digest.update("sales", (uploaded, missed))
+        return uploaded, missed, report
+
+    @traced("pandas.transform", stage="check_missing_branches")
     def check_missing_branches(self, results_df):
         """
         Analyzes branch status and returns a DataFrame with uploaded sales branches.
-        This method checks for branches with a time difference greater than 60 minutes.
+        This method checks for branches whose time difference exceeds the first [freshness] sales threshold (60 minutes by default).
         identifies missed branches, and returns two DataFrames: one for the results and one for the missed branches.
         """
         # Check if the DataFrame is empty
@@ -94,16 +406,17 @@ class DataProcessor(Base):
             self.logger.error("The 'Branch ID' column is missing from the results DataFrame.")
             return None, None
 
-        # Convert 'Time Difference' to timedelta
-        results_df['Time Difference'] = pd.to_timedelta(results_df['Time Difference'])
+        # Severity of every branch from the time since its last upload, in one vectorized pass
+        results_df = results_df.copy()
+        results_df["Severity"] = self.freshness.severity(results_df["Time Difference"], "sales")
         
         # condition for missed branches based on long period from noe to last uploaded
-        condition = results_df["Time Difference"] > timedelta(minutes=60)
+        condition = results_df["Severity"] > 0
         missed_df1 = results_df[condition]
         self.logger.info("Apply condition1 (not outdated)")
 
         # Identify missed branches using set operations for faster performance
-        missed_branches = set(self.branch_data) - set(results_df["Branch ID"])
+        missed_branches = self.branch_registry.keys - set(results_df["Branch ID"])
         self.logger.info("Branch data loaded and filtered.")
 
         # Create DataFrame for missed branches not exist in the uploaded excel sheet if any
@@ -114,8 +427,13 @@ class DataProcessor(Base):
         else:
             missed_branches_df = missed_df1
 
+        # Branches missing from the upload have no time difference and get the highest severity
+        missed_branches_df = missed_branches_df.assign(
+            Severity=self.freshness.label(self.freshness.severity(missed_branches_df["Time Difference"], "sales"))
+        )
+
         # Select relevant columns for the final DataFrames
-        missed_branches_df = missed_branches_df[["Branch ID", "Uploaded Date", "Time Difference"]]
+        missed_branches_df = missed_branches_df[["Branch ID", "Uploaded Date", "Time Difference", "Severity"]]
 
         results_df = results_df[["Branch ID", "Uploaded Date", "Time Difference"]]
         results_df = results_df[~results_df["Branch ID"].isin(missed_branches_df["Branch ID"])]
@@ -0,0 +1,62 @@
+#! <D:\Heba\Practical\AlOthaimApp\src\db_fetch.py>
+
+import datetime
+import decimal
+import numpy as np
+import pandas as pd
+from instrumentation import span
+
+
+def _to_column(values, type_code):
+    """
+    Converts the raw values of one result column to a typed array, using the Python type
+    pyodbc reports for that column in `cursor.description`.
+    """
+    has_nulls = any(v is None for v in values)
+
+    if type_code is bool:
+        return pd.array(values, dtype="boolean") if has_nulls else np.array(values, dtype=bool)
+    if type_code is int:
+        return pd.array(values, dtype="Int64") if has_nulls else np.array(values, dtype=np.int64)
+    if type_code in (float, decimal.Decimal):
+        # None becomes NaN, Decimal is widened to float64
+        return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+    if type_code in (datetime.datetime, datetime.date):
+        return pd.DatetimeIndex(values)
+    return np.array(values, dtype=object)
+
+
+def fetch_frame(cursor, columns=None, batch_size=None):
+    """
+    Builds a DataFrame straight from an executed cursor, one typed column at a time.
+
+    Parameters:
+        cursor (pyodbc.Cursor): Cursor with a pending result set.
+        columns (list[str], optional): Column names for the DataFrame, defaults to the names in cursor.description.
+        batch_size (int, optional): Fetch rows with fetchmany in batches of this size instead of a single fetchall.
+
+    Returns (pd.DataFrame):
+        DataFrame whose dtypes follow the SQL column types (datetime64, int64, float64, bool, object).
+    """
+    description = cursor.description
+    names = list(columns) if columns is not None else [col[0] for col in description]
+    values = [[] for _ in description]
+
+    with span("sql.fetch"):
+        if batch_size:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for column, batch in zip(values, zip(*rows)):
+                    column.extend(batch)
+        else:
+            rows = cursor.fetchall()
+            if rows:
+                values = [list(column) for column in zip(*rows)]
+
+    with span("pandas.build_frame"):
+        return pd.DataFrame(
+            {name: _to_column(column, col[1]) for name, column, col in zip(names, values, description)},
+            columns=names,
+        )
@@ -0,0 +1,179 @@
+#! <D:\Heba\Practical\AlOthaimApp\src\db_pool.py>
+
+import time
+import logging
+import threading
+import pyodbc
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(pyodbc.OperationalError):
+    """Raised when no pooled connection becomes free before the checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of pyodbc connections to a single SQL Server.
+
+    Connections are health-checked on checkout, the number of open connections is capped at
+    `max_size`, and connections left idle longer than `idle_timeout` seconds are closed.
+    Streamlit reruns and concurrent sessions share the pool, so the login handshake is paid
+    once per connection instead of once per query.
+    """
+
+    def __init__(self, connection_string, max_size=5, idle_timeout=300, checkout_timeout=30, login_timeout=0):
+        self.connection_string = connection_string
+        self.login_timeout = login_timeout  # seconds for the ODBC login of a new connection, 0 = driver default
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+
+        self._idle = []   # (connection, last used time), most recently used last
+        self._size = 0    # open connections, idle and checked out
+        self._cond = threading.Condition()
+        self._stats = {"checkouts": 0, "waits": 0, "reconnects": 0, "created": 0, "evicted": 0, "discarded": 0}
+
+    def statistics(self):
+        """Returns the pool counters together with its current size, idle and in-use connections."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(size=self._size, idle=len(self._idle), in_use=self._size - len(self._idle), max_size=self.max_size)
+        return stats
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except pyodbc.Error:
+            pass
+
+    @staticmethod
+    def _is_healthy(conn):
+        """Runs a trivial query to make sure the server did not drop the connection."""
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except pyodbc.Error:
+            return False
+
+    def _evict_idle(self):
+        """Removes connections idle for longer than `idle_timeout`. Must be called holding the lock."""
+        now = time.monotonic()
+        expired = [conn for conn, last_used in self._idle if now - last_used > self.idle_timeout]
+        if expired:
+            self._idle = [(conn, last_used) for conn, last_used in self._idle if now - last_used <= self.idle_timeout]
+            self._size -= len(expired)
+            self._stats["evicted"] += len(expired)
+        return expired
+
+    def acquire(self):
+        """
+        Checks out a connection, waiting up to `checkout_timeout` seconds if the pool is exhausted.
+        Returns:
+            pyodbc.Connection: A healthy connection that must be given back with `release`.
+        """
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._cond:
+            self._stats["checkouts"] += 1
+            expired = self._evict_idle()
+            waited = False
+            while not self._idle and self._size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No connection available after {self.checkout_timeout}s (max_size={self.max_size})")
+                if not waited:
+                    self._stats["waits"] += 1
+                    waited = True
+                self._cond.wait(remaining)
+
+            if self._idle:
+                conn = self._idle.pop()[0]
+            else:
+                conn = None
+                self._size += 1  # Reserve the slot before connecting outside the lock
+
+        for stale in expired:
+            self._close(stale)
+
+        if conn is not None and not self._is_healthy(conn):
+            logger.info("Pooled connection failed health check, reconnecting")
+            self._close(conn)
+            conn = None
+            with self._cond:
+                self._stats["reconnects"] += 1
+
+        if conn is None:
+            try:
+                conn = pyodbc.connect(self.connection_string, timeout=self.login_timeout)
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._stats["created"] += 1
+
+        return conn
+
+    def release(self, conn, discard=False):
+        """Returns a connection to the pool, or closes it when `discard` is set."""
+        with self._cond:
+            if discard:
+                self._size -= 1
+                self._stats["discarded"] += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+        if discard:
+            self._close(conn)
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager mirroring `with pyodbc.connect(...) as conn`: commits on success,
+        rolls back on error, then hands the connection back to the pool instead of dropping it.
+        """
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except pyodbc.Error:
+                discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+            logger.debug(f"Staging pool statistics: {self.statistics()}")
+
+    def close_all(self):
+        """Closes every idle connection; checked-out connections are closed when released with discard."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _ in idle:
+            self._close(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(connection_string, **kwargs):
+    """
+    Returns the process-wide pool for a connection string, creating it on first use.
+    Keyword arguments are only applied when the pool is created.
+    """
+    with _pools_lock:
+        pool = _pools.get(connection_string)
+        if pool is None:
+            pool = ConnectionPool(connection_string, **kwargs)
+            _pools[connection_string] = pool
+        return pool
@@ -0,0 +1,173 @@
+#! <D:\Heba\Practical\AlOthaimApp\src\fleet_digest.py>
+
+import hashlib
+import threading
+import pandas as pd
+
+# Sections of the digest, in the order they are shown to the model
+SECTIONS = ("sales", "backup", "logsize")
+
+# Columns derived from the clock; they change on every check without the data changing
+_VOLATILE_COLUMNS = ["Time Difference"]
+
+
+def estimate_tokens(text):
+    """Approximate token count, about four characters per token for the English text of the digest."""
+    return len(text) // 4 + 1
+
+
+def fingerprint(frames):
+    """Hash of the contents of a check result (a tuple of DataFrames, or None when the check failed)."""
+    digest = hashlib.sha256()
+    for df in frames if frames is not None else (None,):
+        if df is None:
+            digest.update(b"<none>")
+            continue
+        stable = df.drop(columns=_VOLATILE_COLUMNS, errors="ignore")
+        digest.update(",".join(map(str, stable.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(stable, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _when(value):
+    return "never" if pd.isna(value) else pd.Timestamp(value).strftime("%Y-%m-%d %H:%M")
+
+
+class FleetDigest:
+    """
+    Compact, token-budgeted summary of the latest sales, backup and log-size results, given to the
+    chatbot as context instead of whole tables.
+
+    Each section is rebuilt only when the content of its check result changes (clock-derived columns
+    are ignored, and times are written as absolute timestamps so a section stays valid as it ages).
+    The assembled text is cached until a section changes; `version` identifies it, so answers can be
+    cached per digest. One digest is shared by every session, so it reflects the last sales upload
+    analysed by anyone.
+    """
+
+    def __init__(self, token_budget=1500, labels=("OK", "Warning", "Critical"), display_name=None):
+        self.token_budget = token_budget
+        self.labels = list(labels)
+        self.display_name = display_name or str
+        self._sections = {}  # name -> (fingerprint, header line, detail lines worst first)
+        self._version = 0
+        self._rendered = (0, "")
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    @property
+    def version(self):
+        with self._lock:
+            return self._version
+
+    def update(self, section, frames):
+        """
+        Records the latest result of one check, rebuilding its section only if the data changed.
+        Parameters:
+            section (str): "sales", "backup" or "logsize".
+            frames (tuple | None): The (ok, problem) DataFrames returned by the check, None when it failed.
+        Returns:
+            bool: True when the section was rebuilt.
+        """
+        key = fingerprint(frames)
+        with self._lock:
+            current = self._sections.get(section)
+            if current is not None and current[0] == key:
+                return False
+
+        header, lines = getattr(self, f"_{section}_lines")(frames)
+        with self._lock:
+            self._sections[section] = (key, header, lines)
+            self._version += 1
+            self._rendered = None
+            self.rebuilds += 1
+        return True
+
+    def render(self):
+        """Returns (version, text) of the digest, assembling it only after a section changed."""
+        with self._lock:
+            if self._rendered is None:
+                self._rendered = (self._version, self._assemble())
+            return self._rendered
+
+    def _assemble(self):
+        if not self._sections:
+            return "No fleet data has been collected yet."
+
+        # Every section gets an equal share of the budget; its header is always kept
+        budget = self.token_budget // len(self._sections)
+        parts = []
+        for name in SECTIONS:
+            if name not in self._sections:
+                continue
+            _, header, lines = self._sections[name]
+            kept = [header]
+            used = estimate_tokens(header)
+            for index, line in enumerate(lines):
+                more = f"- ... and {len(lines) - index} more"
+                if used + estimate_tokens(line) + estimate_tokens(more) > budget:
+                    kept.append(more)
+                    break
+                kept.append(line)
+                used += estimate_tokens(line)
+            parts.append("\n".join(kept))
+        return "\n\n".join(parts)
+
+    def _rank(self, df):
+        """Severity rank of every row, highest first in the detail lines."""
+        return df["Severity"].map({label: rank for rank, label in enumerate(self.labels)}).fillna(len(self.labels))
+
+    def _sales_lines(self, frames):
+        if frames is None or frames[0] is None:
+            return "Sales uploads: the last uploaded file could not be analysed.", []
+        uploaded, missed = frames
+        header = (f"Sales uploads (file analysed {_when(pd.Timestamp.now())}): "
+                  f"{len(uploaded)} branches uploaded on time, {len(missed)} missed or late.")
+        missed = missed.assign(_rank=self._rank(missed)).sort_values(
+            ["_rank", "Uploaded Date"], ascending=[False, True], na_position="first")
+        lines = [
+            f"- {self.display_name(row['Branch ID'])}: {row['Severity']}, last upload {_when(row['Uploaded Date'])}"
+            for _, row in missed.iterrows()
+        ]
+        return header, lines
+
+    def _backup_lines(self, frames):
+        if frames is None or frames[0] is None:
+            return "Backups: the staging server could not be reached.", []
+        healthy, unhealthy = frames
+        header = f"Backups: {len(healthy)} branches backed up recently, {len(unhealthy)} missed their backup."
+        if unhealthy.empty:
+            return header, []
+        unhealthy = unhealthy.assign(_rank=self._rank(unhealthy)).sort_values(
+            ["_rank", "Last Backup Date"], ascending=[False, True])
+        lines = [
+            f"- {row['Server ID']}: {row['Severity']}, last backup {_when(row['Last Backup Date'])}, "
+            f"ping {row.get('Ping Status', 'unknown')}"
+            for _, row in unhealthy.iterrows()
+        ]
+        return header, lines
+
+    def _logsize_lines(self, frames):
+        if frames is None or frames[0] is None:
+            return "Log file sizes: the staging server could not be reached.", []
+        healthy, large = frames
+        header = f"Log file sizes: {len(healthy)} branches healthy, {len(large)} with a large log file."
+        large = large.assign(_rank=self._rank(large)).sort_values(["_rank", "Size (GB)"], ascending=False)
+        lines = [
+            f"- {row['Server ID']}: {row['Size (GB)']:.2f} GB, {row['Severity']}"
+            for _, row in large.iterrows()
+        ]
+        return header, lines
+
+
+_digest = None
+_digest_lock = threading.Lock()
+
+
+def get_fleet_digest(token_budget=1500, labels=("OK", "Warning", "Critical"), display_name=None):
+    """Returns the process-wide fleet digest, creating it on first use."""
+    global _digest
+    with _digest_lock:
+        if _digest is None:
+            _digest = FleetDigest(token_budget=token_budget, labels=labels, display_name=display_name)
+        return _digest
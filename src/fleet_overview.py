@@ -0,0 +1,158 @@
+#! <D:\Heba\Practical\AlOthaimApp\src\fleet_overview.py>
+
+import time
+import contextvars
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from base import Base
+from instrumentation import span
+
+CHECKS = ("backup", "logsize", "sales")
+
+
+@dataclass(frozen=True)
+class FleetSweep:
+    """
+    Results of one concurrent run of the health checks.
+
+    `results` holds the (ok, problem) DataFrames of each check, or None when it failed; `durations` the
+    seconds each check took and `wall` the seconds the whole sweep took, bounded by the slowest check.
+    """
+    results: dict
+    durations: dict
+    wall: float
+    sales_files: object = None
+    errors: dict = field(default_factory=dict)
+
+
+class FleetOverview(Base):
+    """
+    Runs the backup, log size and sales checks concurrently and joins their results on branch ID,
+    through the branch registry, into one health matrix with a row per branch.
+    """
+
+    def __init__(self, context=None):
+        super().__init__(context)
+
+    def sweep(self, checks=CHECKS, uploads=(), refresh=False, progress=None):
+        """
+        Runs the selected checks at the same time, one thread each.
+        Parameters:
+            checks (Iterable[str]): Any of "backup", "logsize" and "sales".
+            uploads (Iterable): Uploaded files (or batch.LocalFile) for the sales check, skipped when empty.
+            refresh (bool): Skip cached backup and log size results.
+            progress (callable, optional): Progress callback of the backup check, called from its thread.
+        Returns (FleetSweep):
+            Results and timings of every check that ran.
+        """
+        from check_backup import BackupChecker
+        from check_logsize import CheckLogSize
+        from data_processing import DataProcessor
+
+        uploads = list(uploads)
+        tasks = {}
+        if "backup" in checks:
+            tasks["backup"] = lambda: BackupChecker(self.context).check_last_backup_date(progress=progress, refresh=refresh)
+        if "logsize" in checks:
+            tasks["logsize"] = lambda: CheckLogSize(self.context).check_logfile_size(refresh=refresh)
+        if "sales" in checks and uploads:
+            tasks["sales"] = lambda: DataProcessor(self.context).analyze_uploads(uploads)
+
+        def timed(name, task):
+            start = time.perf_counter()
+            with span("check", check=name):
+                value = task()
+            return value, time.perf_counter() - start
+
+        start = time.perf_counter()
+        results, durations, errors, sales_files = {}, {}, {}, None
+        if tasks:
+            with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="fleet-sweep") as executor:
+                # Each check runs in a copy of the caller's context so its spans land in the caller's run
+                futures = {
+                    name: executor.submit(contextvars.copy_context().run, timed, name, task)
+                    for name, task in tasks.items()
+                }
+                for name, future in futures.items():
+                    try:
+                        value, durations[name] = future.result()
+                    except Exception as ex:
+                        self.logger.error(f"Fleet sweep: {name} check crashed: {ex}")
+                        errors[name] = str(ex)
+                        results[name] = None
+                        continue
+                    if name == "sales":
+                        uploaded, missed, sales_files = value
+                        value = (uploaded, missed)
+                    # Every check signals failure with None frames (e.g. VPN off)
+                    results[name] = value if value and value[0] is not None else None
+        wall = time.perf_counter() - start
+
+        self.logger.info(f"Fleet sweep of {', '.join(tasks)} took {wall:.2f}s "
+                         f"(checks: {', '.join(f'{n} {d:.2f}s' for n, d in durations.items())})")
+        return FleetSweep(results=results, durations=durations, wall=wall, sales_files=sales_files, errors=errors)
+
+    def _signal_frame(self, frames, id_column, to_branch_id, columns):
+        """
+        Stacks the (ok, problem) frames of one check into [Branch ID, <columns>] with one row per branch.
+        Rows of the ok frame get the first severity label, problem rows keep their Severity. Columns that
+        neither frame has (e.g. Ping Status when no backup was missed) are left out.
+        """
+        ok, problem = frames
+        ok = ok.assign(Severity=self.freshness.labels[0])
+        stacked = pd.concat([ok, problem], ignore_index=True)
+        stacked["Branch ID"] = [to_branch_id(value) for value in stacked[id_column]]
+        columns = {source: target for source, target in columns.items() if source in stacked}
+        return stacked[["Branch ID", *columns]].rename(columns=columns).drop_duplicates("Branch ID", keep="last")
+
+    def _branch_key(self, server_name):
+        branch = self.branch_registry.by_server(str(server_name))
+        return branch.key if branch is not None else str(server_name)
+
+    def health_matrix(self, sweep):
+        """
+        Joins the results of a sweep into one row per branch of the registry (plus any server the
+        registry does not know), with the status of every signal and the worst of them.
+        Signals whose check failed or did not run are left empty.
+        """
+        labels = list(self.freshness.labels)
+        with span("pandas.transform", stage="health_matrix"):
+            matrix = pd.DataFrame({
+                "Branch ID": [branch.key for branch in self.branch_registry],
+                "Branch": [branch.display_name for branch in self.branch_registry],
+            })
+
+            signals = []
+            if sweep.results.get("sales") is not None:
+                signals.append(("Sales", self._signal_frame(
+                    sweep.results["sales"], "Branch ID", str,
+                    {"Severity": "Sales", "Uploaded Date": "Last Upload"})))
+            if sweep.results.get("backup") is not None:
+                signals.append(("Backup", self._signal_frame(
+                    sweep.results["backup"], "Server ID", self._branch_key,
+                    {"Severity": "Backup", "Last Backup Date": "Last Backup", "Ping Status": "Ping"})))
+            if sweep.results.get("logsize") is not None:
+                signals.append(("Log Size", self._signal_frame(
+                    sweep.results["logsize"], "Server ID", self._branch_key,
+                    {"Severity": "Log Size", "Size (GB)": "Log Size (GB)"})))
+
+            for _, frame in signals:
+                matrix = matrix.merge(frame, on="Branch ID", how="outer")
+            matrix["Branch"] = matrix["Branch"].fillna("Unknown Branch")
+
+            rank = {label: index for index, label in enumerate(labels)}
+            if signals:
+                ranks = pd.concat([matrix[name].map(rank) for name, _ in signals], axis=1).max(axis=1)
+            else:
+                ranks = pd.Series(float("nan"), index=matrix.index)
+            matrix["Worst"] = ranks.map(lambda value: labels[int(value)] if pd.notna(value) else None)
+
+            # Worst branches first
+            matrix = (matrix.assign(_rank=ranks.fillna(-1))
+                      .sort_values(["_rank", "Branch ID"], ascending=[False, True])
+                      .drop(columns="_rank")
+                      .reset_index(drop=True))
+        return matrix
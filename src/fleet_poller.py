@@ -0,0 +1,123 @@
+#! <D:\Heba\Practical\AlOthaimApp\src\fleet_poller.py>
+
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from check_backup import BackupChecker
+from check_logsize import CheckLogSize
+from instrumentation import tracer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class FleetSnapshot:
+    """
+    Results of one run of the staging-server health checks.
+
+    Snapshots are never modified after they are published; pages only read the DataFrames they hold.
+    `backup` and `logsize` are (healthy, unhealthy) pairs, or None when the check failed (e.g. VPN off).
+    """
+    version: int
+    refreshed_at: float
+    duration: float
+    backup: Optional[tuple] = None
+    logsize: Optional[tuple] = None
+
+    def age(self):
+        """Seconds since the snapshot was taken."""
+        return time.time() - self.refreshed_at
+
+
+class FleetPoller:
+    """
+    Runs the backup and log-size checks on a background thread every `interval` seconds and
+    publishes the latest results as an immutable `FleetSnapshot`, so pages render instantly.
+    """
+
+    def __init__(self, context, interval=300):
+        self.interval = interval
+        self.backup_checker = BackupChecker(context)
+        self.logsize_checker = CheckLogSize(context)
+
+        self._snapshot = None
+        self._version = 0
+        self._refresh_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="fleet-poller", daemon=True)
+
+    @property
+    def snapshot(self):
+        """The latest published snapshot, or None before the first run finishes."""
+        return self._snapshot
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                with tracer.run("fleet poll"):
+                    self.refresh()
+            except Exception as ex:
+                logger.error(f"Fleet poll failed: {ex}")
+            # A forced refresh sets the wakeup event and restarts the wait, so the next poll
+            # comes `interval` seconds after the latest snapshot instead of right after it
+            while self._wakeup.wait(self.interval):
+                self._wakeup.clear()
+
+    def refresh(self, force=False, progress=None):
+        """
+        Runs both checks now and publishes a new snapshot. Concurrent callers are serialized, and a
+        caller that had to wait for a run in progress gets that run's snapshot instead of starting another.
+        Parameters:
+            force (bool): Bypass the query cache, used by the on-demand refresh button.
+            progress (callable, optional): Progress callback of the backup check, called from this thread.
+        Returns:
+            FleetSnapshot: The newly published snapshot.
+        """
+        version_before = self._version
+        with self._refresh_lock:
+            if self._version != version_before:
+                return self._snapshot
+
+            start = time.time()
+            backup = self.backup_checker.check_last_backup_date(progress=progress, refresh=force)
+            logsize = self.logsize_checker.check_logfile_size(refresh=force)
+
+            self._version += 1
+            # Publishing is a single reference swap, readers never see a half-built snapshot
+            self._snapshot = FleetSnapshot(
+                version=self._version,
+                refreshed_at=time.time(),
+                duration=time.time() - start,
+                backup=backup if backup and backup[0] is not None else None,
+                logsize=logsize if logsize else None,
+            )
+            logger.info(f"Fleet snapshot v{self._version} refreshed in {self._snapshot.duration:.1f}s")
+
+            # Only the sections whose data changed are rebuilt
+            digest = self.backup_checker.fleet_digest
+            digest.update("backup", self._snapshot.backup)
+            digest.update("logsize", self._snapshot.logsize)
+            if force:
+                self._wakeup.set()
+            return self._snapshot
+
+
+_poller = None
+_poller_lock = threading.Lock()
+
+
+def get_poller(context):
+    """Returns the process-wide poller, starting it on first use with the [fleet_poller] interval."""
+    global _poller
+    with _poller_lock:
+        if _poller is None:
+            interval = context.config.get('fleet_poller', {}).get('interval', 300)
+            _poller = FleetPoller(context, interval=interval).start()
+        return _poller
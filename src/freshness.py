@@ -0,0 +1,66 @@
+#! <D:\Heba\Practical\AlOthaimApp\src\freshness.py>
+
+import numpy as np
+import pandas as pd
+
+# Seconds per unit of each time-based signal's thresholds
+_UNIT_SECONDS = {"sales": 60, "backup": 3600}
+
+
+class FreshnessEngine:
+    """
+    Classifies branches into severity buckets for the three fleet signals:
+        - sales: minutes since the last applied upload
+        - backup: hours since the last channel database backup
+        - logsize: log file size in GB
+
+    Each signal has ascending thresholds from the [freshness] section of config.toml; a value above
+    the i-th threshold gets severity i + 1, so severity 0 is healthy. Missing values (a branch that
+    never uploaded) get the highest severity. Everything is computed on whole arrays at once.
+    """
+
+    def __init__(self, config, tz, logsize_limit=20):
+        section = config.get('freshness', {})
+        self.tz = tz
+        self.thresholds = {
+            "sales": np.sort(np.asarray(section.get('sales_minutes', [60, 240]), dtype=np.float64)),
+            "backup": np.sort(np.asarray(section.get('backup_hours', [1, 24]), dtype=np.float64)),
+            "logsize": np.sort(np.asarray(section.get('logsize_gb', [logsize_limit, 2 * logsize_limit]), dtype=np.float64)),
+        }
+        self.labels = np.asarray(section.get('labels', ["OK", "Warning", "Critical"]), dtype=object)
+
+    def now(self):
+        """Current time in the application timezone."""
+        return pd.Timestamp.utcnow().tz_convert(self.tz)
+
+    def age(self, timestamps, now=None):
+        """
+        Returns how long ago each timestamp was, as a timedelta Series.
+        Naive timestamps (SQL Server datetime columns) are taken as local time and localized once.
+        """
+        timestamps = pd.to_datetime(timestamps)
+        if timestamps.dt.tz is None:
+            timestamps = timestamps.dt.tz_localize(self.tz, ambiguous='NaT', nonexistent='shift_forward')
+        return (now if now is not None else self.now()) - timestamps
+
+    def severity(self, values, signal):
+        """
+        Returns the severity code (int8) of every value for one signal.
+        Parameters:
+            values (pd.Series): Ages (timedelta) for "sales" and "backup", sizes in GB for "logsize".
+            signal (str): "sales", "backup" or "logsize".
+        """
+        thresholds = self.thresholds[signal]
+        if signal in _UNIT_SECONDS:
+            measure = pd.to_timedelta(values).dt.total_seconds().to_numpy(dtype=np.float64) / _UNIT_SECONDS[signal]
+        else:
+            measure = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64)
+
+        # side='left' counts the thresholds strictly below each value, i.e. how many it exceeds
+        codes = np.searchsorted(thresholds, measure, side='left')
+        codes[np.isnan(measure)] = len(thresholds)
+        return codes.astype(np.int8)
+
+    def label(self, codes):
+        """Maps severity codes to their configured labels."""
+        return self.labels[np.minimum(codes, len(self.labels) - 1)]
@@ -0,0 +1,147 @@
+#! <D:\Heba\Practical\AlOthaimApp\src\instrumentation.py>
+
+import os
+import time
+import functools
+import threading
+import contextvars
+from collections import deque, defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+
+@dataclass
+class Span:
+    """One timed stage of a run; `start` is seconds since the run started."""
+    name: str
+    start: float
+    duration: float
+    thread: str
+    labels: dict = field(default_factory=dict)
+
+
+@dataclass
+class Run:
+    """All spans recorded while rendering one page or running one background poll."""
+    label: str
+    started_at: float
+    duration: float = 0.0
+    spans: list = field(default_factory=list)
+
+
+_current_run = contextvars.ContextVar("current_run", default=None)
+
+
+class Tracer:
+    """
+    Lightweight span recorder.
+
+    `run()` wraps a page render or a background poll; `span()` times a stage inside it. The last
+    `max_runs` runs are kept in memory for the diagnostics page, and per-span totals are written
+    to a Prometheus text file after each run so a local scraper can pick them up.
+    Worker threads join the run of the thread that started them through `contextvars.copy_context()`.
+    """
+
+    def __init__(self, max_runs=20, metrics_file=None):
+        self.runs = deque(maxlen=max_runs)
+        self.metrics_file = metrics_file
+        self._lock = threading.Lock()
+        self._totals = defaultdict(lambda: [0, 0.0])  # span name -> [count, seconds]
+        self._gauges = {}
+
+    @contextmanager
+    def run(self, label):
+        """Records a new run for the duration of the block."""
+        current = Run(label=label, started_at=time.time())
+        origin = time.perf_counter()
+        token = _current_run.set((current, origin))
+        try:
+            yield current
+        finally:
+            _current_run.reset(token)
+            current.duration = time.perf_counter() - origin
+            with self._lock:
+                self.runs.append(current)
+            self.write_metrics()
+
+    def label_run(self, label):
+        """Renames the current run, e.g. once the selected page is known."""
+        active = _current_run.get()
+        if active is not None:
+            active[0].label = label
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Times the block and attaches it to the current run, if there is one."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                totals = self._totals[name]
+                totals[0] += 1
+                totals[1] += end - start
+            active = _current_run.get()
+            if active is not None:
+                current, origin = active
+                # list.append is atomic, probe threads may append concurrently
+                current.spans.append(Span(name, start - origin, end - start, threading.current_thread().name, labels))
+
+    def set_gauge(self, name, value):
+        """Publishes an extra value (pool or cache statistics) in the metrics file."""
+        with self._lock:
+            self._gauges[name] = value
+
+    def write_metrics(self):
+        """Writes span counts and total seconds in the Prometheus text format."""
+        if not self.metrics_file:
+            return
+        with self._lock:
+            totals = {name: tuple(values) for name, values in self._totals.items()}
+            gauges = dict(self._gauges)
+
+        lines = [
+            "# HELP alothaim_span_seconds Time spent in each instrumented stage.",
+            "# TYPE alothaim_span_seconds summary",
+        ]
+        for name, (count, seconds) in sorted(totals.items()):
+            lines.append(f'alothaim_span_seconds_count{{span="{name}"}} {count}')
+            lines.append(f'alothaim_span_seconds_sum{{span="{name}"}} {seconds:.6f}')
+        for name, value in sorted(gauges.items()):
+            lines.append(f"# TYPE alothaim_{name} gauge")
+            lines.append(f"alothaim_{name} {value}")
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.metrics_file)), exist_ok=True)
+        tmp_file = f"{self.metrics_file}.{threading.get_ident()}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        # Replace atomically so a scraper never reads a half-written file
+        os.replace(tmp_file, self.metrics_file)
+
+
+tracer = Tracer()
+
+
+def configure_tracer(config):
+    """Applies the [diagnostics] section of config.toml to the process-wide tracer."""
+    section = config.get('diagnostics', {})
+    tracer.runs = deque(tracer.runs, maxlen=section.get('runs', 20))
+    tracer.metrics_file = section.get('metrics_file', os.path.join("logs", "metrics.prom"))
+    return tracer
+
+
+def span(name, **labels):
+    """Shortcut for `tracer.span`."""
+    return tracer.span(name, **labels)
+
+
+def traced(name, **labels):
+    """Decorator that records every call of the function as a span."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,21 @@
+#! <D:\Heba\Practical\AlOthaimApp\src\lazy.py>
+
+import types
+import importlib
+
+
+class LazyModule(types.ModuleType):
+    """
+    Placeholder for a heavy module that is imported on first attribute access.
+    `pd = LazyModule("pandas")` keeps pandas out of the Home page startup path while the rest
+    of the module keeps using `pd.` as usual.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.__name__)
+        # Later lookups hit the real attributes directly
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
@@ -1,15 +1,17 @@
 #! <D:\Heba\Practical\AlOthaimApp\src\open_branch.py>
 
 import pyodbc
-import pandas as pd
-import numpy as np
 from base import Base
+from db_fetch import fetch_frame
+from instrumentation import span
 
 class OpenNewBranch(Base):
     
-    def __init__(self):
-        super().__init__()
-        
+    def __init__(self, context=None):
+        super().__init__(context)
+        # States as last read from the database, the baseline for diff-only saves
+        self.loaded_states = None
+
     # Load checkbox states from SQL Server
     def load_checkbox_states(self):
         """
@@ -21,20 +23,16 @@ class OpenNewBranch(Base):
         self.logger.info(f"Connecting to SQL Server: {self.stag_connection}")
 
         try:
-            with pyodbc.connect(self.stag_connection) as conn:
+            with self.stag_pool.connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("SELECT Category, StepID, Description, Completed FROM OpenBranchSteps")
-                results = cursor.fetchall()
-
-            # Convert results to a DataFrame
-            br_steps_data = pd.DataFrame(
-                np.array(results), columns=["Category", "StepID", "Description", "Completed"]
-            )
+                with span("sql.execute", query="load_steps"):
+                    cursor.execute("SELECT Category, StepID, Description, Completed FROM OpenBranchSteps")
+                # Typed columns straight from the cursor: StepID is int64 and the BIT Completed column is bool
+                br_steps_data = fetch_frame(cursor, columns=["Category", "StepID", "Description", "Completed"])
 
             # br_steps_data["Category"] = br_steps_data["Category"].apply(lambda x: x.split('.')[-1].strip())
-            br_steps_data[["StepID", "Completed"]] = br_steps_data[["StepID", "Completed"]].astype(np.int8)
-            br_steps_data['Completed'] = br_steps_data['Completed'].map({1: True, 0: False})
             br_steps_data["Completed"] = br_steps_data["Completed"].astype(bool)
+            self.loaded_states = br_steps_data.groupby('Category')['Completed'].apply(list).to_dict()
             
             return br_steps_data
         
@@ -42,40 +40,68 @@ class OpenNewBranch(Base):
             self.logger.error(f"Error loading checkbox states: {e}")
             return None
 
-    def save_checkbox_states(self, checkbox_states):
+    @staticmethod
+    def diff_checkbox_states(checkbox_states, previous_states=None):
         """
-        Save the current checkbox states back to the database.
+        Compares checkbox states with the last loaded or saved states.
+
+        Args:
+            checkbox_states (dict): Current checkbox states grouped by category.
+            previous_states (dict, optional): States the database is known to hold. When None every step is returned.
+
+        Returns:
+            list[tuple]: (completed, category, step_id) rows for the steps that changed.
+        """
+        changes = []
+        for category, states in checkbox_states.items():
+            previous = (previous_states or {}).get(category, [])
+            for step_id, completed in enumerate(states, start=1):  # Assuming StepID starts from 1
+                if previous_states is None or step_id > len(previous) or bool(previous[step_id - 1]) != bool(completed):
+                    changes.append((bool(completed), category, step_id))
+        return changes
+
+    def save_checkbox_states(self, checkbox_states, previous_states=None):
+        """
+        Save the checkbox states that changed back to the database.
+
+        Only steps that differ from previous_states are sent, as one batched UPDATE
+        (fast_executemany) inside a single transaction.
 
         Args:
             checkbox_states (dict): A dictionary containing the checkbox states grouped by headers.
+            previous_states (dict, optional): States as last loaded from or saved to the database.
+                Defaults to the states read by the last load_checkbox_states call on this object.
+
+        Returns:
+            int: Number of rows written, or None if saving failed.
         """
+        if previous_states is None:
+            previous_states = self.loaded_states
+        changes = self.diff_checkbox_states(checkbox_states, previous_states)
+        if not changes:
+            self.logger.info("No checkbox changes to save.")
+            return 0
+
         self.logger.info(f"Connecting to SQL Server: {self.stag_connection}")
         try:
-            with pyodbc.connect(self.stag_connection) as conn:
+            with self.stag_pool.connection() as conn:
                 cursor = conn.cursor()
-
-                for category, states in checkbox_states.items():
-                    # Log the category and states being processed
-                    self.logger.info(f"Processing category: {category} with states: {states}")
-
-                    # Update each checkbox state directly using the index
-                    for step_id, completed in enumerate(states, start=1):  # Assuming StepID starts from 1
-                        print(f"Updating {category} StepID {step_id} to {completed}")
-                        self.logger.info(f"Updating {category} StepID {step_id} to {completed}")
-                        cursor.execute(
-                            """
-                            UPDATE OpenBranchSteps
-                            SET Completed = ?
-                            WHERE Category = ? AND StepID = ?
-                            """,
-                            completed,
-                            category,
-                            step_id,
-                        )
-
-                conn.commit()  # Ensure changes are committed
-                self.logger.info("Checkbox states saved successfully.")
+                cursor.fast_executemany = True
+                with span("sql.execute", query="save_steps", rows=len(changes)):
+                    cursor.executemany(
+                        """
+                        UPDATE OpenBranchSteps
+                        SET Completed = ?
+                        WHERE Category = ? AND StepID = ?
+                        """,
+                        changes,
+                    )
+            # The pooled connection commits the whole batch in one transaction on exit
+            self.logger.info(f"Checkbox states saved successfully, {len(changes)} rows written.")
+            self.logger.debug(f"Saved steps: {changes}")
+            return len(changes)
         except pyodbc.Error as e:
             self.logger.error(f"Error saving checkbox states: {e}")
         except Exception as ex:
-            self.logger.error(f"An unexpected error occurred: {ex}")
\ No newline at end of file
+            self.logger.error(f"An unexpected error occurred: {ex}")
+        return None
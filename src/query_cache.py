@@ -0,0 +1,102 @@
+#! <D:\Heba\Practical\AlOthaimApp\src\query_cache.py>
+
+import time
+import threading
+
+
+class _Flight:
+    """A computation in progress that other callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlightCache:
+    """
+    TTL result cache with single-flight de-duplication.
+
+    The first caller for a key runs the computation; identical calls arriving while it runs wait for
+    that result instead of issuing their own query. Results are served from the cache until they are
+    `ttl` seconds old. Cached values are shared between sessions and must be treated as read-only.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._entries = {}   # key -> (expires at, value)
+        self._inflight = {}  # key -> _Flight
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    def statistics(self):
+        """Returns the hit, miss and coalesced counters and the number of cached entries."""
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), inflight=len(self._inflight))
+
+    def invalidate(self, key=None):
+        """Drops one cached key, or every key when none is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def get_or_compute(self, key, compute, refresh=False, should_cache=None):
+        """
+        Returns the cached value for key, computing it at most once across concurrent callers.
+
+        Parameters:
+            key (Hashable): Identity of the query, e.g. its SQL and parameters.
+            compute (callable): Produces the value when it is not cached.
+            refresh (bool): Ignore a cached value and compute again (still joins an in-flight run).
+            should_cache (callable, optional): Predicate on the result; results it rejects
+                (such as a failed connection) are returned but not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not refresh and entry[0] > time.monotonic():
+                self._stats["hits"] += 1
+                return entry[1]
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+            if should_cache is None or should_cache(flight.value):
+                with self._lock:
+                    self._entries[key] = (time.monotonic() + self.ttl, flight.value)
+            return flight.value
+        except Exception as ex:
+            flight.error = ex
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_query_cache(ttl=60):
+    """Returns the process-wide staging-server query cache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SingleFlightCache(ttl=ttl)
+        return _cache
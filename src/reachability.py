@@ -0,0 +1,60 @@
+#! <D:\Heba\Practical\AlOthaimApp\src\reachability.py>
+
+import asyncio
+
+# Ping Status values of a branch probe
+SUCCESS = "Success"
+HOST_DOWN = "Host Down"
+PORT_CLOSED = "Port Closed"
+LOGIN_FAILED = "Login Failed"
+UNKNOWN_HOST = "Unknown Host"  # The server name maps to no branch address, nothing was probed
+REACHABLE = "Reachable"  # Preflight only: the port accepts connections, the ODBC login is still to come
+
+
+async def _probe_tcp(host, port, timeout, semaphore):
+    """Opens and closes one TCP connection, classifying the host by how the attempt ends."""
+    async with semaphore:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        except asyncio.TimeoutError:
+            return HOST_DOWN
+        except ConnectionRefusedError:
+            # The machine answered with a reset: it is up but SQL Server is not listening
+            return PORT_CLOSED
+        except OSError:
+            # No route to host, network unreachable, name resolution errors
+            return HOST_DOWN
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return REACHABLE
+
+
+async def _sweep(hosts, port, timeout, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = await asyncio.gather(*(_probe_tcp(host, port, timeout, semaphore) for host in hosts))
+    return dict(zip(hosts, statuses))
+
+
+def tcp_preflight(hosts, port=1433, timeout=1.0, concurrency=256):
+    """
+    Checks every host's SQL Server port at once with non-blocking TCP connects.
+
+    A sweep costs about one `timeout` regardless of the number of hosts, so only hosts that answer
+    need the much slower authenticated ODBC login.
+
+    Parameters:
+        hosts (Iterable[str]): Host names or IP addresses.
+        port (int): SQL Server TCP port.
+        timeout (float): Seconds to wait for each connect.
+        concurrency (int): Maximum connects in flight, bounds the number of open sockets.
+    Returns:
+        dict[str, str]: REACHABLE, HOST_DOWN or PORT_CLOSED for every distinct host.
+    """
+    hosts = list(dict.fromkeys(hosts))
+    if not hosts:
+        return {}
+    # Runs its own event loop, callers are the Streamlit script thread or the poller thread
+    return asyncio.run(_sweep(hosts, port, timeout, concurrency))
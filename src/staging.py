@@ -0,0 +1,94 @@
+#! <D:\Heba\Practical\AlOthaimApp\src\staging.py>
+
+import time
+import logging
+import contextvars
+from typing import NamedTuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+logger = logging.getLogger(__name__)
+
+
+class StagingEndpoint(NamedTuple):
+    """One regional staging server holding Backup_DB and logfile_size."""
+    name: str                # "Cairo", shown when a region can not be reached
+    connection_string: str   # ODBC connection string
+    timeout: float           # seconds allowed for the login and queries of this endpoint
+
+
+def _connection_string(server, database, uid, pwd):
+    return (
+        f"DRIVER={{ODBC Driver 17 for SQL Server}};"
+        f"SERVER={server};"
+        f"UID={uid};"
+        f"PWD={pwd};"
+        f"DATABASE={database};"
+    )
+
+
+def staging_endpoints(config, server_ip, db_name, uid, pwd):
+    """
+    Reads the [[staging]] tables of config.toml into StagingEndpoints. Without any, the single staging
+    server of the DB_* environment variables is used. Credentials always come from the environment.
+    """
+    endpoints = [
+        StagingEndpoint(
+            name=entry.get('name', entry['server']),
+            connection_string=_connection_string(entry['server'], entry.get('database', db_name), uid, pwd),
+            timeout=entry.get('timeout', 15),
+        )
+        for entry in config.get('staging', [])
+    ]
+    return tuple(endpoints) or (StagingEndpoint("Staging", _connection_string(server_ip, db_name, uid, pwd), 15),)
+
+
+def query_endpoints(endpoints, run, pool_settings):
+    """
+    Runs the same query against every staging endpoint concurrently.
+
+    Each endpoint uses its own connection pool and is given `endpoint.timeout` seconds; an endpoint that
+    fails or is still running at its deadline is reported as failed and left behind, so one slow or dead
+    region never holds up the others.
+
+    Parameters:
+        endpoints (Sequence[StagingEndpoint]): Staging servers to query.
+        run (callable): Called as run(cursor) on a pooled connection, returns the endpoint's DataFrame.
+        pool_settings (dict): Keyword arguments of the connection pools.
+    Returns:
+        (list[tuple[StagingEndpoint, pd.DataFrame]], list[str]): Results of the endpoints that answered,
+            in endpoint order, and the names of those that did not.
+    """
+    from db_pool import get_pool
+
+    def query(endpoint):
+        pool = get_pool(endpoint.connection_string, login_timeout=int(endpoint.timeout), **pool_settings)
+        with pool.connection() as conn:
+            # Query timeout of this endpoint, in seconds; the connection goes back to a pool shared with
+            # other staging work (e.g. the branch opening checklist), so its own timeout is restored
+            previous = conn.timeout
+            conn.timeout = int(endpoint.timeout)
+            try:
+                return run(conn.cursor())
+            finally:
+                conn.timeout = previous
+
+    start = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=len(endpoints), thread_name_prefix="staging")
+    # Each query runs in a copy of the caller's context so its spans land in the caller's run
+    futures = [executor.submit(contextvars.copy_context().run, query, endpoint) for endpoint in endpoints]
+    results, failed = {}, []
+    try:
+        # Shortest deadline first, each endpoint is waited on until its own deadline only
+        for endpoint, future in sorted(zip(endpoints, futures), key=lambda pair: pair[0].timeout):
+            try:
+                results[endpoint] = future.result(timeout=max(0.0, start + endpoint.timeout - time.monotonic()))
+            except FuturesTimeout:
+                logger.warning(f"Staging server {endpoint.name} did not answer within {endpoint.timeout}s")
+                failed.append(endpoint.name)
+            except Exception as ex:
+                logger.error(f"Staging server {endpoint.name} failed: {ex}")
+                failed.append(endpoint.name)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return [(endpoint, results[endpoint]) for endpoint in endpoints if endpoint in results], failed
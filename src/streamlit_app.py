@@ -1,18 +1,28 @@
 #! <D:\Heba\Practical\AlOthaimApp\src\streamlit_app.py>
+from __future__ import annotations
+
 import os
-import numpy as np
+import sys
+import time
 import base64
-import pyodbc
-import pandas as pd
 import streamlit as st
+from functools import cached_property
 from streamlit_option_menu import option_menu
 from typing import Optional
 
 from base import Base
-from data_processing import DataProcessor
-from check_backup import BackupChecker
-from check_logsize import CheckLogSize
-from open_branch import OpenNewBranch
+from lazy import LazyModule
+from instrumentation import tracer, traced
+
+# pandas and the checker modules (pyodbc, numpy, openpyxl) load when a page first needs them,
+# so the Home page renders without paying for them
+pd = LazyModule("pandas")
+
+def duration_text(seconds):
+    """Formats a duration as whole seconds under a minute, whole minutes otherwise."""
+    seconds = int(seconds)
+    return f"{seconds} seconds" if seconds < 60 else f"{seconds // 60} minutes"
+
 
 class AlOthaimApp(Base):
     """
@@ -25,12 +35,40 @@ class AlOthaimApp(Base):
       - Check the last SQL Server backup date
     """
 
-    def __init__(self):
-        super().__init__()
-        self.data_processor = DataProcessor()
-        self.backup_checker = BackupChecker()
-        self.logsize_checker = CheckLogSize()
-        self.new_branch = OpenNewBranch() 
+    def __init__(self, context=None):
+        super().__init__(context)
+
+    # All checkers share the process-wide context instead of re-reading config on every rerun,
+    # and each one is imported and built only when its page is opened
+    @cached_property
+    def data_processor(self):
+        from data_processing import DataProcessor
+        return DataProcessor(self.context)
+
+    @cached_property
+    def backup_checker(self):
+        from check_backup import BackupChecker
+        return BackupChecker(self.context)
+
+    @cached_property
+    def logsize_checker(self):
+        from check_logsize import CheckLogSize
+        return CheckLogSize(self.context)
+
+    @cached_property
+    def new_branch(self):
+        from open_branch import OpenNewBranch
+        return OpenNewBranch(self.context)
+
+    @cached_property
+    def fleet_overview(self):
+        from fleet_overview import FleetOverview
+        return FleetOverview(self.context)
+
+    @cached_property
+    def chatbot(self):
+        from chatbot import OthaimyChatbot
+        return OthaimyChatbot(self.context)
     
     def display_image(self, path):
         # Get the absolute path of the image
@@ -48,23 +86,25 @@ class AlOthaimApp(Base):
                 unsafe_allow_html=True,
             )
     
-    def upload_excel_file(self) -> Optional[st.runtime.uploaded_file_manager.UploadedFile]:
+    def upload_excel_file(self) -> list[st.runtime.uploaded_file_manager.UploadedFile]:
         """
         Provide interface for Excel file upload.
         Returns:
-            Optional[UploadedFile]: The uploaded file object if successful, None otherwise
+            list[UploadedFile]: The uploaded file objects, empty when nothing was uploaded
         """
         with st.container():
-            st.subheader("Upload Excel File (Sales Data)")
-            st.caption("Please upload the Excel file exported from Dynamics 365 Upload Sessions screen")
+            st.subheader("Upload Excel Files (Sales Data)")
+            st.caption("Please upload the Excel, CSV or Parquet files exported from Dynamics 365 Upload Sessions screen, "
+                       "several days or regions are merged into the latest upload per branch")
             return st.file_uploader(
                 "Upload Excel File",
-                type=["xlsx"],
-                help="Drag and drop file here or click to upload.",
+                type=["xlsx", "csv", "parquet"],
+                help="Drag and drop files here or click to upload.",
                 label_visibility="hidden",
-                accept_multiple_files=False
+                accept_multiple_files=True
             )
     
+    @traced("render", page="display_sales")
     def display_sales(self, uploaded_branches: pd.DataFrame, missed_branches: pd.DataFrame) -> None:
         """
         Displays uploaded and missed sales analysis in a Streamlit container with two columns.
@@ -105,6 +145,7 @@ class AlOthaimApp(Base):
                     )
                     st.balloons()
 
+    @traced("render", page="display_backup")
     def display_backup(self, healthy_branches: pd.DataFrame, unhealthy_branches: pd.DataFrame) -> None:
         """
         This method displays the analysis results of backup status for all branches in a visually appealing layout. 
@@ -148,6 +189,7 @@ class AlOthaimApp(Base):
                     )
                     st.balloons()
 
+    @traced("render", page="display_logsize")
     def display_logsize(self, healthy_branches: pd.DataFrame, largelog_branches: pd.DataFrame) -> None:
         """
         This method displays the analysis results of log file sizes for all branches in a visually appealing layout. 
@@ -200,17 +242,112 @@ class AlOthaimApp(Base):
                     )
                     st.balloons()
 
+    def display_logfile_pages(self) -> None:
+        """
+        Browses every log file one keyset page at a time, so only the page on screen is read from the
+        staging servers. The cursor of every visited page is kept in session state for "Previous".
+        """
+        if not st.toggle("Browse all log files page by page", key="browse_logfiles"):
+            return
+
+        cursors = st.session_state.setdefault("logfile_cursors", [None])
+        page, next_after = self.logsize_checker.browse_logfiles(cursors[-1])
+        if page is None:
+            st.error("Turn On your VPN")
+            return
+        self.warn_unreachable_staging((page,))
+        st.caption(f"Page {len(cursors)}")
+        st.dataframe(page, use_container_width=True, hide_index=True)
+
+        previous_col, next_col = st.columns(2)
+        if previous_col.button("Previous", disabled=len(cursors) == 1, key="logfile_previous"):
+            cursors.pop()
+            st.rerun()
+        if next_col.button("Next", disabled=next_after is None, key="logfile_next"):
+            cursors.append(next_after)
+            st.rerun()
+
+    def warn_unreachable_staging(self, frames) -> None:
+        """Warns that the results miss the branches of the staging servers that did not answer."""
+        unreachable = frames[0].attrs.get("unreachable_staging") if frames else None
+        if unreachable:
+            st.warning(f"No answer from staging server(s) {', '.join(unreachable)}, their branches are not shown")
+
+    def get_fleet_snapshot(self, page: str):
+        """
+        Returns the latest background fleet snapshot for the Backup and Logfile Size pages,
+        showing how old it is and a button to refresh it on demand.
+        Parameters:
+            page (str): Page name, used to keep the refresh button key unique.
+        """
+        from fleet_poller import get_poller
+
+        poller = get_poller(self.context)
+        snapshot = poller.snapshot
+
+        refresh_col, age_col = st.columns([1, 4])
+        refresh_clicked = refresh_col.button("Refresh now", key=f"refresh_{page}", icon=":material/refresh:")
+        if refresh_clicked or snapshot is None:
+            # The check runs on this script thread, so the per-branch probes can stream into a progress bar
+            progress_bar = st.progress(0, text="Checking the staging server...")
+            snapshot = poller.refresh(
+                force=refresh_clicked,
+                progress=lambda value, text=None: progress_bar.progress(value, text=text),
+            )
+            progress_bar.empty()
+
+        age_col.caption(f"Last refreshed {duration_text(snapshot.age())} ago, "
+                        f"refreshed automatically every {duration_text(poller.interval)}")
+        return snapshot
+
+    @traced("render", page="display_opening_steps")
     def display_opening_steps(self) -> None:
         """
         Displays the steps with checkboxes and handles saving/loading checkbox states.
+
+        Steps are read from the database once per session, or when "Reload" is clicked. Everything
+        else runs inside the checklist fragment against session state, so ticking a checkbox does not
+        rerun the whole page or query the database.
         """
-        
-        # Load checkbox states from the database only once
-        br_steps_data = self.new_branch.load_checkbox_states()
+        reload_clicked = st.button("Reload from database", icon=":material/refresh:")
 
-        # Initialize session state for checkbox states if not already done
-        if 'checkbox_states' not in st.session_state:
+        # Load checkbox states from the database only once per session
+        if reload_clicked or 'br_steps_data' not in st.session_state:
+            br_steps_data = self.new_branch.load_checkbox_states()
+            if br_steps_data is None:
+                st.error("Turn On your VPN")
+                return
+
+            st.session_state['br_steps_data'] = br_steps_data
             st.session_state['checkbox_states'] = br_steps_data.groupby('Category')['Completed'].apply(list).to_dict()
+            # What the database holds, so Save only sends the steps that changed
+            st.session_state['saved_checkbox_states'] = self.new_branch.loaded_states
+            st.session_state['last_change_at'] = 0.0
+            # Drop stale widget values so the checkboxes pick up the reloaded states
+            for category, step_id in zip(br_steps_data['Category'], br_steps_data['StepID']):
+                st.session_state.pop(f"{category}_{step_id}", None)
+
+        # With write-behind on, the fragment also reruns on a timer to flush pending changes
+        run_every = self.write_behind if self.write_behind > 0 else None
+        st.fragment(self.display_checklist, run_every=run_every)()
+
+    def flush_checkbox_states(self) -> Optional[int]:
+        """Saves the pending checkbox changes of this session and returns the number of rows written."""
+        written = self.new_branch.save_checkbox_states(
+            st.session_state.checkbox_states, st.session_state.saved_checkbox_states
+        )
+        if written is not None:
+            st.session_state['saved_checkbox_states'] = {
+                category: list(states) for category, states in st.session_state.checkbox_states.items()
+            }
+        return written
+
+    def display_checklist(self) -> None:
+        """
+        Checklist fragment: renders the expanders from session state and saves on demand, or
+        automatically once no checkbox has changed for `write_behind` seconds.
+        """
+        br_steps_data = st.session_state['br_steps_data']
 
         # Icons for each section
         icons = [":material/cloud:", ":material/warehouse:",  ":material/settings:",
@@ -224,21 +361,159 @@ class AlOthaimApp(Base):
         for myicon, (category, group) in zip(icons, grouped_data):
             with st.expander(f'{category}', icon=myicon): 
                 # Iterate through each step in the group for this header
-                for index, row in group.reset_index(drop=True).iterrows():
-                    is_checked = st.session_state.checkbox_states[category][index]                    
+                for index, row in enumerate(group.itertuples(index=False)):
+                    is_checked = st.session_state.checkbox_states[category][index]
 
-                    # Ensure the checkbox is in sync with the database value
-                    st.session_state.checkbox_states[category][index] = st.checkbox(
-                        row['Description'],
+                    checked = st.checkbox(
+                        row.Description,
                         value = is_checked,  # Set initial checkbox state from the database
-                        key=f"{category}_{row['StepID']}",
+                        key=f"{category}_{row.StepID}",
                     )
-                    
+                    if checked != is_checked:
+                        st.session_state.checkbox_states[category][index] = checked
+                        st.session_state['last_change_at'] = time.time()
+
+        pending = len(self.new_branch.diff_checkbox_states(
+            st.session_state.checkbox_states, st.session_state.saved_checkbox_states
+        ))
+        idle_for = time.time() - st.session_state['last_change_at']
+
         # Save button to save the progress
         if st.button("Save"):
-            self.new_branch.save_checkbox_states(st.session_state.checkbox_states)
-            st.success("Progress saved!")
+            written = self.flush_checkbox_states()
+            if written is None:
+                st.error("Saving failed, check your VPN and try again.")
+            else:
+                st.success(f"Progress saved! {written} step(s) updated.")
             # st.balloons()
+        elif pending and self.write_behind > 0 and idle_for >= self.write_behind:
+            written = self.flush_checkbox_states()
+            if written is not None:
+                st.caption(f"Auto-saved {written} step(s).")
+        elif pending:
+            st.caption(f"{pending} unsaved change(s).")
+
+    @traced("render", page="display_fleet_overview")
+    def display_fleet_overview(self) -> None:
+        """
+        Runs the backup, log size and (when files were uploaded on the Sales page) sales checks at the
+        same time and shows one health row per branch, worst first.
+        """
+        uploads = st.session_state.get("sales_uploads", [])
+        refresh_clicked = st.button("Refresh now", key="refresh_overview", icon=":material/refresh:")
+
+        with st.spinner("Checking the fleet..."):
+            sweep = self.fleet_overview.sweep(uploads=uploads, refresh=refresh_clicked)
+            matrix = self.fleet_overview.health_matrix(sweep)
+
+        timings = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in sweep.durations.items())
+        st.caption(f"Checked in {sweep.wall:.1f}s ({timings})")
+        if not uploads:
+            st.caption("Upload sales files on the Sales page to include the sales check.")
+        for name, result in sweep.results.items():
+            if result is not None:
+                if name != "sales":
+                    self.warn_unreachable_staging(result)
+            elif name in sweep.errors:
+                st.warning(f"The {name} check failed: {sweep.errors[name]}")
+            elif name == "sales":
+                # Sales reads the uploaded files, not the network: show why they could not be used
+                report = sweep.sales_files
+                reasons = "no valid upload"
+                if report is not None and not report.empty:
+                    reasons = ", ".join(f"{file}: {status}" for file, status in zip(report["File"], report["Status"]))
+                st.warning(f"The sales check failed ({reasons}), upload valid files on the Sales page")
+            else:
+                st.warning(f"The {name} check failed, turn On your VPN")
+
+        columns = st.columns(len(self.freshness.labels))
+        for column, label in zip(columns, self.freshness.labels):
+            column.metric(label, int((matrix["Worst"] == label).sum()))
+        st.dataframe(matrix, use_container_width=True, hide_index=True)
+
+    @traced("render", page="display_chat")
+    def display_chat(self) -> None:
+        """
+        Chat with Othaimy. Answers are streamed as they are generated, and repeated questions about the
+        same fleet data are answered from the answer cache.
+        """
+        from fleet_poller import get_poller
+
+        # The poller keeps the backup and log size sections of the chatbot's fleet digest current
+        get_poller(self.context)
+
+        history = st.session_state.setdefault("chat_history", [])
+        for role, content in history:
+            with st.chat_message(role):
+                st.markdown(content)
+
+        question = st.chat_input("Ask Othaimy about the branches")
+        if not question:
+            return
+
+        history.append(("user", question))
+        with st.chat_message("user"):
+            st.markdown(question)
+
+        with st.chat_message("assistant"):
+            try:
+                answer = st.write_stream(self.chatbot.stream_response(question))
+            except Exception as ex:
+                self.logger.error(f"Error generating response: {ex}")
+                st.error("Othaimy is not available right now, please try again later.")
+                return
+        history.append(("assistant", answer))
+
+    def display_diagnostics(self) -> None:
+        """
+        Hidden diagnostics page (open the app with ?page=diagnostics): a waterfall of the spans recorded
+        in the last runs, plus the staging pool and query cache statistics.
+        """
+        import altair as alt
+
+        st.markdown("<h1 style='text-align: center;'>Diagnostics</h1>", unsafe_allow_html=True)
+        runs = list(tracer.runs)[::-1]
+        if not runs:
+            st.info("No runs recorded yet.")
+            return
+
+        st.dataframe(
+            pd.DataFrame({
+                "Run": [run.label for run in runs],
+                "Started": [pd.Timestamp(run.started_at, unit='s', tz='UTC').tz_convert(self.cairo_tz) for run in runs],
+                "Duration (ms)": [round(run.duration * 1000, 1) for run in runs],
+                "Spans": [len(run.spans) for run in runs],
+            }),
+            hide_index=True,
+        )
+
+        index = st.selectbox("Run", range(len(runs)), format_func=lambda i: f"{runs[i].label} ({runs[i].duration * 1000:.0f} ms)")
+        spans = pd.DataFrame([
+            {
+                "Span": span.name + "".join(f" {value}" for value in span.labels.values()),
+                "Start (ms)": span.start * 1000,
+                "End (ms)": (span.start + span.duration) * 1000,
+                "Duration (ms)": round(span.duration * 1000, 2),
+                "Thread": span.thread,
+            }
+            for span in sorted(runs[index].spans, key=lambda span: span.start)
+        ])
+        if not spans.empty:
+            chart = alt.Chart(spans).mark_bar().encode(
+                x=alt.X("Start (ms)", title="ms since run start"),
+                x2="End (ms)",
+                y=alt.Y("Span", sort=None),
+                color="Thread",
+                tooltip=["Span", "Duration (ms)", "Thread"],
+            )
+            st.altair_chart(chart, use_container_width=True)
+            st.dataframe(spans, hide_index=True)
+
+        left_col, right_col = st.columns(2)
+        left_col.subheader("Staging pool")
+        left_col.json(self.stag_pool.statistics())
+        right_col.subheader("Query cache")
+        right_col.json(self.query_cache.statistics())
 
     def main(self) -> None:
         """
@@ -254,6 +529,8 @@ class AlOthaimApp(Base):
             - Backup: Checks the last backup date and displays the result.
             - Logfile Size: Checks the logfile size and displays the result.
             - Branch Opening: Displays the branch opening checklist.
+            - Fleet Overview: Runs all checks concurrently and shows one health row per branch.
+            - Othaimy: Chat assistant with streamed answers.
             - Leave Note: Displays a placeholder for leaving notes (currently under development).
         """
         self.logger.info("Starting application")
@@ -261,14 +538,20 @@ class AlOthaimApp(Base):
         # --- Sidebar Menu ---
         with st.sidebar:
             selected = option_menu(
-                        "Main Menu", ["Home","Sales", 'Backup', 'Logfile Size', 'New Branch', 'Leave Note'],
-                        icons=['house','cloud-upload', 'database', 'file-earmark-text', 'shop-window', 'pen'],
+                        "Main Menu", ["Home","Sales", 'Backup', 'Logfile Size', 'Fleet Overview', 'New Branch', 'Othaimy', 'Leave Note'],
+                        icons=['house','cloud-upload', 'database', 'file-earmark-text', 'grid-3x3', 'shop-window', 'robot', 'pen'],
                         menu_icon="cast", default_index=0, orientation="vertical",
                         styles={"nav-link": {"font-size": "14px"},
                                 "nav-link-selected": {"background-color": "green"}}
                     )
+        tracer.label_run(selected)
+
+        # --- Hidden Diagnostics Page ---
+        if st.query_params.get("page") == "diagnostics":
+            self.display_diagnostics()
+
         # --- Welcoming Page ---
-        if selected == "Home":            
+        elif selected == "Home":            
             st.markdown( "<h1 style='text-align: center;'>Abdullah AlOthaim Markets Egypt</h1>", unsafe_allow_html=True)
             self.display_image(os.path.join("assets", "logo.png"))
             
@@ -276,11 +559,14 @@ class AlOthaimApp(Base):
         elif selected == "Sales":
             st.markdown("<h1 style='text-align: center;'>Review Sales for Uploaded Branches</h1>", unsafe_allow_html=True)
 
-            uploaded_file = self.upload_excel_file()
-            if uploaded_file:
+            uploaded_files = self.upload_excel_file()
+            # Kept for the Fleet Overview page, which has no uploader of its own
+            st.session_state["sales_uploads"] = uploaded_files or []
+            if uploaded_files:
 
-                results_df = self.data_processor.process_data(uploaded_file)
-                all_branches, missed_branches = self.data_processor.check_missing_branches(results_df)
+                all_branches, missed_branches, report = self.data_processor.analyze_uploads(uploaded_files)
+                with st.expander(f"{len(report)} file(s) processed", expanded=len(report) > 1):
+                    st.dataframe(report, use_container_width=True, hide_index=True)
 
                 if all_branches is not None and missed_branches is not None:
                     self.display_sales(all_branches, missed_branches)
@@ -298,12 +584,12 @@ class AlOthaimApp(Base):
                 """, unsafe_allow_html=True 
             )     
             
-            results = self.backup_checker.check_last_backup_date()
-            # bar.progress(100, text="Completed")            
-            if not results:
+            snapshot = self.get_fleet_snapshot("backup")
+            if snapshot.backup is None:
                 st.error("Turn On your VPN")
             else:
-                self.display_backup(results[0], results[1])
+                self.warn_unreachable_staging(snapshot.backup)
+                self.display_backup(snapshot.backup[0], snapshot.backup[1])
 
         # --- Review Logfile Size Page ---
         elif selected == "Logfile Size":
@@ -315,11 +601,20 @@ class AlOthaimApp(Base):
                 </div>
                 """, unsafe_allow_html=True 
             )    
-            results = self.logsize_checker.check_logfile_size()
-            if not results:
+            snapshot = self.get_fleet_snapshot("logsize")
+            if snapshot.logsize is None:
                 st.error("Turn On your VPN")
             else:
-                self.display_logsize(results[0], results[1])
+                if self.logsize_top_n:
+                    st.caption(f"Showing the {self.logsize_top_n} largest log files only")
+                self.warn_unreachable_staging(snapshot.logsize)
+                self.display_logsize(snapshot.logsize[0], snapshot.logsize[1])
+            self.display_logfile_pages()
+
+        # --- Fleet Overview Page ---
+        elif selected == "Fleet Overview":
+            st.markdown("<h1 style='text-align: center;'>Fleet Overview</h1>", unsafe_allow_html=True)
+            self.display_fleet_overview()
 
         # --- New Branch Opening Page ---
         elif selected == "New Branch":
@@ -330,6 +625,10 @@ class AlOthaimApp(Base):
             )
             self.display_opening_steps()
             
+        elif selected == 'Othaimy':
+            st.markdown("<h1 style='text-align: center;'>Ask Othaimy</h1>", unsafe_allow_html=True)
+            self.display_chat()
+
         elif selected == 'Leave Note':
             st.text("Coming soon!")
             # from streamlit_chat import message
@@ -384,5 +683,17 @@ if __name__ == "__main__":
     with open(css_path, encoding='utf-8') as file:
         st.markdown(f"<style>{file.read()}</style>", unsafe_allow_html=True)
 
-    app = AlOthaimApp()
-    app.main()
+    # Every rerun is recorded as one run for the diagnostics page and the metrics file
+    with tracer.run("rerun"):
+        app = AlOthaimApp()
+        app.main()
+        # Only report the pool once a page has loaded it, reading it would import pyodbc on Home
+        if "db_pool" in sys.modules:
+            for name, value in app.stag_pool.statistics().items():
+                tracer.set_gauge(f"staging_pool_{name}", value)
+        for name, value in app.query_cache.statistics().items():
+            tracer.set_gauge(f"query_cache_{name}", value)
+        if "answer_cache" in sys.modules:
+            from answer_cache import get_answer_cache
+            for name, value in get_answer_cache().statistics().items():
+                tracer.set_gauge(f"answer_cache_{name}", value)
@@ -0,0 +1,154 @@
+#! <D:\Heba\Practical\AlOthaimApp\src\upload_cache.py>
+
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: without pyarrow uploads are parsed every time and Parquet uploads are rejected
+    pa = pq = None
+
+
+def content_hash(data):
+    """Returns the SHA-256 hex digest of the uploaded file bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class UploadCache:
+    """
+    Process-wide LRU cache of processed sales uploads.
+
+    Entries are DataFrames keyed by (file content hash, branch registry version). The cache is
+    bounded both by number of entries and by the total deep memory usage of the stored frames;
+    the least recently used entries are dropped first when either limit is exceeded.
+    """
+
+    def __init__(self, max_entries=8, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (DataFrame, size in bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns a copy of the cached DataFrame for key, or None when it is not cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # Callers add and overwrite columns, so never hand out the cached frame itself
+            return entry[0].copy()
+
+    def put(self, key, df):
+        """Stores a copy of df under key, evicting old entries to respect the size limits."""
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (df.copy(), size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_upload_cache(max_entries=8, max_bytes=64 * 1024 * 1024):
+    """Returns the process-wide upload cache, creating it on first use with the given limits."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = UploadCache(max_entries=max_entries, max_bytes=max_bytes)
+        return _cache
+
+
+def converted_path(directory, digest):
+    """Returns where the columnar copy of the upload with this content hash is stored."""
+    return os.path.join(directory, f"{digest}.parquet")
+
+
+def load_converted(path):
+    """
+    Loads a workbook previously converted by `save_converted`.
+    Return (pd.DataFrame, int): Latest upload per channel database and the data rows of the original
+        workbook, or None when there is no usable copy.
+    """
+    if pq is None or not os.path.exists(path):
+        return None
+    try:
+        table = pq.read_table(path)
+        # Age is counted from the last use, so exports analysed again are not evicted
+        os.utime(path)
+    except (OSError, pa.ArrowException):
+        return None
+    rows = int((table.schema.metadata or {}).get(b"rows", b"0"))
+    return table.to_pandas(), rows
+
+
+def save_converted(path, df, rows):
+    """
+    Stores the parsed workbook as Parquet so the same export is never parsed from Excel again.
+    Written to a temporary file first, so concurrent readers never see a partial file. The copy is only
+    an optimisation: a frame Arrow can not convert (e.g. mixed cell types) or a failed write is skipped.
+    """
+    if pq is None:
+        return False
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"rows": str(rows).encode()})
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+    except (OSError, pa.ArrowException):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    return True
+
+
+_purged_at = {}  # directory -> time of its last purge
+_purge_lock = threading.Lock()
+
+
+def purge_converted(directory, retention_days, interval=3600):
+    """
+    Deletes the converted uploads in directory that were not used for more than retention_days,
+    and temporary files left by interrupted writes. Runs at most once per interval seconds per directory.
+    """
+    now = time.time()
+    with _purge_lock:
+        if now - _purged_at.get(directory, 0) < interval:
+            return
+        _purged_at[directory] = now
+    if not retention_days or not os.path.isdir(directory):
+        return
+
+    cutoff = now - retention_days * 86400
+    for name in os.listdir(directory):
+        file_path = os.path.join(directory, name)
+        if name.endswith((".parquet", ".tmp")) and os.path.isfile(file_path) and os.path.getmtime(file_path) < cutoff:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
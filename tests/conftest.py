@@ -0,0 +1,34 @@
+#! <D:\Heba\Practical\AlOthaimApp\tests\conftest.py>
+"""
+Shared setup of the behaviour tests: the application modules are imported from src/, and the staging
+and branch servers are replaced by the in-memory fake_pyodbc backend of the benchmarks.
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+# The context reads .streamlit/config.toml and assets/branch_data.json relative to the repository root
+os.chdir(ROOT)
+
+import fake_pyodbc
+
+# Must happen before the application modules import pyodbc
+fake_pyodbc.install()
+
+
+@pytest.fixture
+def context():
+    from context import get_context
+    return get_context()
+
+
+@pytest.fixture
+def fake_server():
+    """A fresh fake backend for every test."""
+    yield fake_pyodbc.configure()
+    fake_pyodbc.configure()
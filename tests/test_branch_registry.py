@@ -0,0 +1,50 @@
+#! <D:\Heba\Practical\AlOthaimApp\tests\test_branch_registry.py>
+
+import json
+import threading
+
+import pytest
+
+from branch_registry import BranchRegistry
+
+BRANCHES = {"50012": "الدقي - طهران, Dokki - Tehran", "50013": "Maadi"}
+
+
+@pytest.fixture
+def registry():
+    return BranchRegistry.from_json_bytes(json.dumps(BRANCHES, ensure_ascii=False).encode("utf-8"))
+
+
+def test_lookups_by_name_in_both_languages(registry):
+    assert registry.by_name("dokki - TEHRAN").key == "50012"
+    assert registry.by_name("الدقي - طهران").key == "50012"
+    assert registry.by_name(" Maadi ").key == "50013"
+    assert registry.by_name("Nasr City") is None
+
+
+def test_lookups_by_channel_and_server(registry):
+    assert registry.by_channel("EG50012-CHANNELDB").key == "50012"
+    assert registry.by_channel("EG59999-CHANNELDB") is None
+    assert registry.by_channel("CHANNELDB") is None
+    assert registry.by_server("br50013-maadi").key == "50013"
+    assert registry.by_server("MAIN-SRV") is None
+
+
+def test_indexes_can_not_be_changed(registry):
+    with pytest.raises(TypeError):
+        registry._by_key["50014"] = registry.by_id(50012)
+
+
+def test_concurrent_lookups_agree(registry):
+    results = []
+
+    def lookup(i):
+        results.append(registry.by_channel(f"EG5001{2 + i % 2}-DB{i}").key)
+
+    threads = [threading.Thread(target=lookup, args=(i,)) for i in range(200)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == ["50012"] * 100 + ["50013"] * 100
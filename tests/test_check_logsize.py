@@ -0,0 +1,52 @@
+#! <D:\Heba\Practical\AlOthaimApp\tests\test_check_logsize.py>
+
+import pytest
+
+from check_logsize import CheckLogSize
+
+# Five servers with three log files each, so pages of 2 or 4 rows split servers across page boundaries
+LOGFILES = [
+    (f"BR5000{server}-SRV", 1024 * (server + file), f"D:\\SQLData\\CHANNEL_{server}_log{file}.ldf")
+    for server in range(1, 6)
+    for file in range(3)
+]
+EXPECTED = sorted((name, path) for name, _, path in LOGFILES)
+
+
+@pytest.fixture
+def checker(context, fake_server):
+    fake_server.logfile = list(reversed(LOGFILES))
+    return CheckLogSize(context)
+
+
+def keys(frame):
+    return list(zip(frame["Server ID"], frame["File Path"]))
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 4, 15, 100])
+def test_keyset_pages_return_every_file_once(checker, page_size):
+    checker.logsize_page_size = page_size
+    with checker.stag_pool.connection() as conn:
+        frame = checker._fetch_logfiles(conn.cursor())
+
+    assert keys(frame) == EXPECTED
+
+
+def test_browse_walks_every_page_in_order(checker):
+    pages, after = [], None
+    while True:
+        page, after = checker.browse_logfiles(after, page_size=4)
+        pages.append(keys(page))
+        if after is None:
+            break
+
+    assert [len(page) for page in pages] == [4, 4, 4, 3]
+    assert [key for page in pages for key in page] == EXPECTED
+
+
+def test_top_n_returns_the_largest_files(checker):
+    with checker.stag_pool.connection() as conn:
+        frame = checker._fetch_logfiles(conn.cursor(), top_n=3)
+
+    largest = sorted(LOGFILES, key=lambda row: (-row[1], row[0]))[:3]
+    assert keys(frame) == [(name, path) for name, _, path in largest]
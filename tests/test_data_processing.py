@@ -0,0 +1,91 @@
+#! <D:\Heba\Practical\AlOthaimApp\tests\test_data_processing.py>
+
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+import pytest
+
+import data_processing
+import synthetic
+from batch import LocalFile
+from data_processing import DataProcessor
+from upload_cache import get_upload_cache
+
+# "Time Difference" is measured against the clock at processing time
+COLUMNS = ["Channel database", "Branch ID", "Uploaded Date"]
+
+
+@pytest.fixture
+def processor(context, tmp_path):
+    get_upload_cache().clear()
+    processor = DataProcessor(context)
+    processor.converted_upload_dir = str(tmp_path / "converted")
+    return processor
+
+
+def workbook(tmp_path, seed, rows=400):
+    return synthetic.generate_workbook(str(tmp_path / f"uploads_{seed}.xlsx"), rows=rows, seed=seed)
+
+
+def test_load_uploads_matches_process_data(processor, tmp_path):
+    path = workbook(tmp_path, seed=1)
+    baseline = processor.process_data(path)
+
+    frames, report = processor.load_uploads([LocalFile(path)])
+
+    assert list(report["Status"]) == ["Parsed"]
+    assert report["Branches"][0] == len(baseline)
+    pd.testing.assert_frame_equal(frames[0][COLUMNS], baseline[COLUMNS])
+
+
+def test_repeated_upload_comes_from_the_cache(processor, tmp_path):
+    path = workbook(tmp_path, seed=2)
+    first, _ = processor.load_uploads([LocalFile(path)])
+
+    again, report = processor.load_uploads([LocalFile(path)])
+
+    assert list(report["Status"]) == ["Cached"]
+    pd.testing.assert_frame_equal(again[0][COLUMNS], first[0][COLUMNS])
+
+
+def test_parallel_uploads_match_process_data(processor, tmp_path):
+    paths = [workbook(tmp_path, seed=seed) for seed in (3, 4)]
+
+    frames, report = processor.load_uploads([LocalFile(path) for path in paths])
+
+    assert list(report["Status"]) == ["Parsed", "Parsed"]
+    for frame, path in zip(frames, paths):
+        pd.testing.assert_frame_equal(frame[COLUMNS], processor.process_data(path)[COLUMNS])
+
+
+@pytest.mark.parametrize("content", [b"", b"not a workbook", bytes(range(256)) * 8])
+def test_invalid_workbook_is_reported_not_raised(processor, tmp_path, content):
+    path = tmp_path / "corrupt.xlsx"
+    path.write_bytes(content)
+
+    assert processor.process_data(str(path)) == "Invalid data format"
+
+
+def test_dead_parser_worker_is_replaced(processor, tmp_path):
+    # Kill a worker of the shared pool, as a crash or the OOM killer would
+    broken = data_processing.get_parse_pool(processor.parse_workers)
+    with pytest.raises(BrokenProcessPool):
+        broken.submit(os._exit, 1).result(30)
+
+    paths = [workbook(tmp_path, seed=seed) for seed in (5, 6)]
+    frames, report = processor.load_uploads([LocalFile(path) for path in paths])
+
+    assert list(report["Status"]) == ["Parsed", "Parsed"]
+    assert data_processing.get_parse_pool(processor.parse_workers) is not broken
+
+
+def test_corrupt_file_fails_alone(processor, tmp_path):
+    corrupt = tmp_path / "corrupt.xlsx"
+    corrupt.write_bytes(b"not a workbook")
+    path = workbook(tmp_path, seed=7)
+
+    frames, report = processor.load_uploads([LocalFile(str(corrupt)), LocalFile(path)])
+
+    assert list(report["Status"]) == ["Invalid data format", "Parsed"]
+    assert len(frames) == 1
@@ -0,0 +1,45 @@
+#! <D:\Heba\Practical\AlOthaimApp\tests\test_fleet_poller.py>
+
+import time
+
+import pytest
+
+import fake_pyodbc
+import reachability
+from fleet_poller import FleetPoller
+
+
+@pytest.fixture
+def poller(context, fake_server, monkeypatch):
+    # Branch servers are simulated, so is the TCP sweep in front of their logins
+    monkeypatch.setattr(reachability, "tcp_preflight", fake_pyodbc.fake_tcp_preflight)
+    return FleetPoller(context, interval=60)
+
+
+def test_refresh_streams_backup_progress(poller):
+    updates = []
+
+    snapshot = poller.refresh(force=True, progress=lambda value, text=None: updates.append((value, text)))
+
+    assert snapshot.backup is not None
+    values = [value for value, _ in updates]
+    assert values[0] == 0 and values[-1] == 100
+    assert values == sorted(values)
+    # One update per probed branch
+    assert sum(1 for _, text in updates if text and text.startswith("Pinged")) == len(snapshot.backup[1])
+
+
+def test_forced_refresh_restarts_the_poll_interval(poller):
+    poller.start()
+    deadline = time.monotonic() + 10
+    while poller.snapshot is None:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    forced = poller.refresh(force=True)
+    time.sleep(0.3)
+
+    # The wakeup only restarts the wait, the background thread does not poll again right away
+    assert forced.version == 2
+    assert poller.snapshot is forced
+    assert not poller._wakeup.is_set()
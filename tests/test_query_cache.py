@@ -0,0 +1,102 @@
+#! <D:\Heba\Practical\AlOthaimApp\tests\test_query_cache.py>
+
+import time
+import threading
+
+import pytest
+
+from query_cache import SingleFlightCache
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.005)
+
+
+def test_concurrent_callers_share_one_computation():
+    cache = SingleFlightCache(ttl=60)
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return object()
+
+    results = [None] * 8
+
+    def call(index):
+        results[index] = cache.get_or_compute("backup", compute)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(results))]
+    for thread in threads:
+        thread.start()
+    # Every caller has joined the flight of the first one before it finishes
+    wait_for(lambda: cache.statistics()["coalesced"] == len(results) - 1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert cache.statistics()["inflight"] == 0
+
+
+def test_result_is_reused_until_it_expires():
+    cache = SingleFlightCache(ttl=0.05)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_compute("logsize", compute) == 1
+    assert cache.get_or_compute("logsize", compute) == 1
+    time.sleep(0.1)
+    assert cache.get_or_compute("logsize", compute) == 2
+    assert cache.statistics()["hits"] == 1
+
+
+def test_refresh_and_rejected_results_skip_the_cache():
+    cache = SingleFlightCache(ttl=60)
+    values = iter([None, "first", "second"])
+
+    def compute():
+        return next(values)
+
+    # A failed check (None) is returned but not cached
+    assert cache.get_or_compute("k", compute, should_cache=lambda value: value is not None) is None
+    assert cache.get_or_compute("k", compute, should_cache=lambda value: value is not None) == "first"
+    assert cache.get_or_compute("k", compute) == "first"
+    assert cache.get_or_compute("k", compute, refresh=True) == "second"
+
+
+def test_error_reaches_every_waiter_and_is_not_cached():
+    cache = SingleFlightCache(ttl=60)
+    release = threading.Event()
+    errors = []
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError("staging down")
+
+    def call():
+        try:
+            cache.get_or_compute("k", failing)
+        except RuntimeError as ex:
+            errors.append(ex)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: cache.statistics()["coalesced"] == 2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(errors) == 3
+    assert cache.get_or_compute("k", lambda: "recovered") == "recovered"
+    with pytest.raises(KeyError):
+        cache.get_or_compute("other", lambda: {}["missing"])